@@ -4,18 +4,29 @@ IntelliLearn Flask Web Application - Fixed Version
 Complete web interface with student dashboard
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, g
 from flask_cors import CORS
+import atexit
 import json
 import os
 import sys
-from datetime import datetime
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from core.recommender import IntelliLearnEngine
-from utils.mastery_state import save_student_progress, load_student_progress, init_database
+from core.bkt_fit import load_parameter_table
+from core.forgetting import ForgettingModel
+from core.mastery_store import MasteryStore
+from core.q_learning import SharedQLearningRecommender
+from core.planner import LearningPathPlanner
+from core.recommendation_cache import RecommendationCache
+from core.clustering import LearningStyleClassifier, STYLE_MODEL_PATH
+from utils.response_history import ResponseHistory
+from utils.session_store import SessionStore
+from utils.shared_sessions import SharedSessionBackend, SharedSessionStore
+from utils.write_behind import WriteBehindWriter
+from utils.mastery_state import init_database
 
 app = Flask(__name__)
 app.secret_key = 'intellilearn_secret_key_2024'  # Change this in production
@@ -28,8 +39,81 @@ with open('data/topics_graph.json', 'r') as f:
 with open('data/questions.json', 'r') as f:
     QUESTIONS = json.load(f)
 
-# Store student sessions in memory (use database in production)
-student_sessions = {}
+# Per-topic BKT parameters fitted by core/bkt_fit.py (empty means defaults)
+BKT_PARAMS = load_parameter_table()
+
+# Optional forgetting: set INTELLILEARN_HALF_LIFE_DAYS to enable mastery decay
+HALF_LIFE_DAYS = float(os.environ.get('INTELLILEARN_HALF_LIFE_DAYS', 0))
+FORGETTING = ForgettingModel(HALF_LIFE_DAYS) if HALF_LIFE_DAYS > 0 else None
+
+# Mastery of every student lives in one columnar students x topics matrix
+MASTERY_STORE = MasteryStore(TOPICS)
+
+# One Q-Learning policy learns from every student
+Q_POLICY = SharedQLearningRecommender(TOPICS, dense=True)
+
+# Binary Q-model: memory-mapped at startup, changed rows merged back on exit
+# (every worker process adds its own updates under a file lock)
+Q_MODEL_PATH = os.path.join('data', 'q_model.bin')
+if os.path.exists(Q_MODEL_PATH):
+    Q_POLICY.load_binary(Q_MODEL_PATH)
+
+
+def checkpoint_q_policy():
+    """Merge changed Q-rows into the model on exit; a run that learned nothing writes no file"""
+    if Q_POLICY.has_unsaved_changes():
+        Q_POLICY.save_checkpoint(Q_MODEL_PATH)
+
+
+atexit.register(checkpoint_q_policy)
+
+# Deterministic learning paths, memoized per mastery bucket vector
+PATH_PLANNER = LearningPathPlanner(TOPICS, Q_POLICY, BKT_PARAMS)
+
+# Latest recommendation per student, valid until their next response
+RECOMMENDATIONS = RecommendationCache()
+
+# Population K-Means centroids when trained, hand-written rules otherwise
+STYLE_CLASSIFIER = LearningStyleClassifier(STYLE_MODEL_PATH)
+if os.environ.get('INTELLILEARN_ONLINE_STYLES') and STYLE_CLASSIFIER.centroids is not None:
+    # Centroids keep adapting per response and are snapshotted back to disk
+    STYLE_CLASSIFIER.enable_online(STYLE_MODEL_PATH)
+    atexit.register(STYLE_CLASSIFIER.snapshot)
+
+# Progress saves are queued and committed in batches off the request path;
+# INTELLILEARN_DURABILITY is off, normal, full or sync (write-through)
+WRITER = WriteBehindWriter(
+    flush_interval_ms=float(os.environ.get('INTELLILEARN_FLUSH_MS', 50)),
+    durability=os.environ.get('INTELLILEARN_DURABILITY', 'normal')
+).start()
+atexit.register(WRITER.close)
+
+# Resident student sessions: least recently used and idle ones are written
+# back to the database and rebuilt from it on their next request
+SESSION_OPTIONS = {
+    'max_resident': int(os.environ.get('INTELLILEARN_MAX_SESSIONS', 1000)),
+    'ttl_seconds': float(os.environ.get('INTELLILEARN_SESSION_TTL', 1800)),
+    'write_back': lambda student_name, student_data: evict_session(student_name, student_data)
+}
+
+# Set INTELLILEARN_SHARED_SESSIONS to a SQLite path (e.g. data/sessions.db)
+# to share sessions between worker processes on this machine
+SHARED_SESSIONS_PATH = os.environ.get('INTELLILEARN_SHARED_SESSIONS')
+if SHARED_SESSIONS_PATH:
+    student_sessions = SharedSessionStore(
+        lambda student_name: rehydrate_session(student_name),
+        SharedSessionBackend(SHARED_SESSIONS_PATH),
+        lambda student_data: dump_session(student_data),
+        lambda student_name, state: restore_session(student_name, state),
+        **SESSION_OPTIONS
+    )
+else:
+    student_sessions = SessionStore(
+        lambda student_name: rehydrate_session(student_name),
+        **SESSION_OPTIONS
+    )
+student_sessions.start_sweeper()
+atexit.register(student_sessions.close)
 
 # Initialize database
 try:
@@ -38,6 +122,128 @@ except Exception as e:
     print(f"Warning: Could not initialize database: {e}")
 
 
+def load_progress(student_name):
+    """Saved progress, from another worker's live snapshot when there is one"""
+    if SHARED_SESSIONS_PATH:
+        loaded = student_sessions.backend.load(student_name)
+        if loaded is not None:
+            return loaded[1]
+    return WRITER.load_student_progress(student_name)
+
+
+def create_session(student_name, progress=None):
+    """
+    Build a student's session from saved progress
+    
+    Args:
+        student_name: Student identifier
+        progress: Saved progress; loaded with load_progress if None
+    
+    Returns:
+        tuple: (session data, saved progress or None for a new student)
+    """
+    # Create new engine instance for this student
+    student_engine = IntelliLearnEngine(
+        TOPICS, BKT_PARAMS, FORGETTING,
+        mastery_store=MASTERY_STORE, student_name=student_name,
+        q_learner=Q_POLICY, recommendation_cache=RECOMMENDATIONS,
+        style_classifier=STYLE_CLASSIFIER
+    )
+    
+    # Load existing progress; new students start at each topic's initial mastery
+    if progress is None:
+        progress = load_progress(student_name)
+    if progress:
+        student_engine.load_mastery(
+            progress['mastery_levels'],
+            progress['mastery_timestamps']
+        )
+    
+    student_data = {
+        'engine': student_engine,
+        'responses': ResponseHistory(TOPICS),
+        'current_topic': 'Variables',
+        'learning_style': progress.get('learning_style', 'visual') if progress else 'visual'
+    }
+    
+    # Running totals and the current topic saved with the progress
+    state = progress.get('session_state') if progress else None
+    if state:
+        student_data['current_topic'] = state['current_topic']
+        student_engine.features.load_dict(state['features'])
+        student_engine.style_point = state.get('style_point')
+        student_data['responses'].load_dict(state['responses'])
+    
+    return student_data, progress
+
+
+def rehydrate_session(student_name):
+    """Rebuild an evicted session, or None for a student with nothing saved"""
+    progress = WRITER.load_student_progress(student_name)
+    return create_session(student_name, progress)[0] if progress else None
+
+
+def session_state(student_data):
+    """Session fields the progress columns do not cover"""
+    return {
+        'current_topic': student_data['current_topic'],
+        'features': student_data['engine'].features.to_dict(),
+        'style_point': student_data['engine'].style_point,
+        'responses': student_data['responses'].to_dict()
+    }
+
+
+def save_session(student_name, student_data):
+    """Queue a save of a session's progress and session state"""
+    student_engine = student_data['engine']
+    WRITER.save_student_progress(
+        student_name,
+        student_engine.mastery_levels,
+        student_data['learning_style'],
+        student_engine.last_updated,
+        session_state(student_data)
+    )
+
+
+def evict_session(student_name, student_data):
+    """Write an evicted session back and free its mastery row"""
+    save_session(student_name, student_data)
+    MASTERY_STORE.release(student_data['engine'].mastery_levels)
+
+
+def dump_session(student_data):
+    """Serialize a session shared between worker processes (load_student_progress shape)"""
+    student_engine = student_data['engine']
+    return {
+        'mastery_levels': dict(student_engine.mastery_levels),
+        'mastery_timestamps': student_engine.last_updated,
+        'learning_style': student_data['learning_style'],
+        'session_state': session_state(student_data)
+    }
+
+
+def restore_session(student_name, state):
+    """Rebuild a session from dump_session output"""
+    return create_session(student_name, state)[0]
+
+
+if SHARED_SESSIONS_PATH:
+    @app.before_request
+    def checkout_student():
+        """Hold the student's cross-process lock for the whole API request"""
+        student_name = session.get('student_name')
+        if student_name and request.path.startswith('/api/'):
+            student_sessions.acquire(student_name)
+            g.checked_out = student_name
+    
+    @app.teardown_request
+    def checkin_student(exc):
+        """Publish the student's session to other workers and unlock"""
+        student_name = g.pop('checked_out', None)
+        if student_name:
+            student_sessions.release(student_name)
+
+
 @app.route('/')
 def index():
     """Landing page"""
@@ -64,37 +270,18 @@ def login():
         # Store in session
         session['student_name'] = student_name
         
-        # Create new engine instance for this student
-        student_engine = IntelliLearnEngine(TOPICS)
-        
-        # Load existing progress or create new
-        progress = load_student_progress(student_name)
+        student_data, progress = create_session(student_name)
+        student_sessions[student_name] = student_data
         
         if progress:
-            # Existing student - load their data
-            student_engine.mastery_levels = progress['mastery_levels']
-            student_sessions[student_name] = {
-                'engine': student_engine,
-                'responses': [],
-                'current_topic': 'Variables',
-                'learning_style': progress.get('learning_style', 'visual')
-            }
             print(f"✓ Loaded existing student: {student_name}")
             return jsonify({
                 'message': f'Welcome back, {student_name}!',
                 'existing': True,
-                'mastery_levels': progress['mastery_levels'],
+                'mastery_levels': student_data['engine'].get_mastery_levels(),
                 'learning_style': progress.get('learning_style')
             })
         else:
-            # New student
-            student_engine.mastery_levels = {topic: 0.1 for topic in TOPICS.keys()}
-            student_sessions[student_name] = {
-                'engine': student_engine,
-                'responses': [],
-                'current_topic': 'Variables',
-                'learning_style': 'visual'
-            }
             print(f"✓ Created new student: {student_name}")
             return jsonify({
                 'message': f'Welcome, {student_name}!',
@@ -123,9 +310,9 @@ def get_topics():
                 'description': info['description'],
                 'difficulty': info['difficulty'],
                 'prereqs': info['prereqs'],
-                'mastery': student_engine.mastery_levels.get(topic, 0.1),
+                'mastery': student_engine.get_mastery(topic),
                 'mastery_level': student_engine.bkt.get_mastery_level(
-                    student_engine.mastery_levels.get(topic, 0.1)
+                    student_engine.get_mastery(topic)
                 )
             })
         
@@ -158,7 +345,7 @@ def get_question():
         return jsonify({
             'topic': topic,
             'question': question,
-            'mastery': student_engine.mastery_levels.get(topic, 0.1)
+            'mastery': student_engine.get_mastery(topic)
         })
     except Exception as e:
         print(f"Get question error: {e}")
@@ -192,31 +379,19 @@ def submit_answer():
             attempts
         )
         
-        # Store response for learning style analysis
-        student_data['responses'].append({
-            'topic': topic,
-            'is_correct': answer == correct,
-            'time_spent': time_spent,
-            'attempts': attempts,
-            'timestamp': datetime.now().isoformat()
-        })
+        # Store response for the statistics endpoint
+        student_data['responses'].append(topic, answer == correct, time_spent, attempts)
+        WRITER.log_response(student_name, topic, answer == correct, time_spent, attempts)
         
         # Get recommendation for next topic
-        recommendation = student_engine.get_recommendation(
-            topic,
-            student_data['responses']
-        )
+        recommendation = student_engine.get_recommendation(topic)
         
         # Update learning style
         student_data['learning_style'] = recommendation['learning_style']
         student_data['current_topic'] = recommendation['next_topic']
         
-        # Save progress
-        save_student_progress(
-            student_name,
-            student_engine.mastery_levels,
-            recommendation['learning_style']
-        )
+        # Save progress (queued; committed by the write-behind thread)
+        save_session(student_name, student_data)
         
         return jsonify({
             'correct': answer == correct,
@@ -229,6 +404,30 @@ def submit_answer():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/recommendation', methods=['GET'])
+def get_recommendation():
+    """Get the current recommendation without submitting an answer"""
+    try:
+        student_name = session.get('student_name', 'Guest')
+        
+        if student_name not in student_sessions:
+            return jsonify({'error': 'Please login first'}), 401
+        
+        student_data = student_sessions[student_name]
+        # A read: reuse the last answer's recommendation, never train the policy
+        recommendation = student_data['engine'].get_recommendation(
+            student_data.get('current_topic', 'Variables'), learn=False
+        )
+        
+        return jsonify({
+            'recommendation': recommendation,
+            'style_info': recommendation['style_info']
+        })
+    except Exception as e:
+        print(f"Recommendation error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get student statistics"""
@@ -242,14 +441,15 @@ def get_stats():
         student_engine = student_data['engine']
         responses = student_data['responses']
         
-        # Calculate statistics
-        total_questions = len(responses)
-        correct_answers = sum(1 for r in responses if r['is_correct'])
+        # Calculate statistics from the history's running totals
+        total_questions = responses.total
+        correct_answers = responses.total_correct
         accuracy = (correct_answers / total_questions * 100) if total_questions > 0 else 0
         
         # Mastery distribution
+        mastery_levels = student_engine.get_mastery_levels()
         mastery_counts = {'Novice': 0, 'Beginner': 0, 'Developing': 0, 'Proficient': 0, 'Expert': 0}
-        for mastery in student_engine.mastery_levels.values():
+        for mastery in mastery_levels.values():
             level = student_engine.bkt.get_mastery_level(mastery)
             mastery_counts[level] += 1
         
@@ -259,8 +459,8 @@ def get_stats():
             'accuracy': round(accuracy, 1),
             'learning_style': student_data['learning_style'],
             'mastery_distribution': mastery_counts,
-            'avg_time': sum(r['time_spent'] for r in responses) / len(responses) if responses else 0,
-            'topics_mastered': sum(1 for m in student_engine.mastery_levels.values() if m >= 0.8)
+            'avg_time': responses.total_time / total_questions if total_questions > 0 else 0,
+            'topics_mastered': sum(1 for m in mastery_levels.values() if m >= 0.8)
         })
     except Exception as e:
         print(f"Get stats error: {e}")
@@ -273,9 +473,6 @@ def get_learning_path():
     try:
         student_name = session.get('student_name')
         
-        print(f"Learning path request from: {student_name}")
-        print(f"Active sessions: {list(student_sessions.keys())}")
-        
         if not student_name:
             return jsonify({'error': 'Not logged in'}), 401
         
@@ -284,64 +481,24 @@ def get_learning_path():
         
         student_data = student_sessions[student_name]
         student_engine = student_data['engine']
-        
-        # Generate learning path based on current mastery
-        path = []
-        current = student_data.get('current_topic', 'Variables')
-        visited = set()
+        mastery_levels = student_engine.get_mastery_levels()
         
         # Ensure current topic exists
+        current = student_data.get('current_topic', 'Variables')
         if current not in TOPICS:
             current = 'Variables'
         
-        print(f"Starting path from: {current}")
-        
-        for i in range(5):  # Get next 5 topics
-            if current in visited or current not in TOPICS:
-                print(f"Breaking at step {i}: current={current}, visited={visited}")
-                break
-            
-            mastery = student_engine.mastery_levels.get(current, 0.1)
+        # Plan the next 5 topics based on current mastery
+        path = []
+        for topic in PATH_PLANNER.plan(mastery_levels, current, 5):
+            mastery = mastery_levels.get(topic, 0.1)
             path.append({
-                'topic': current,
+                'topic': topic,
                 'mastery': round(mastery, 3),
                 'level': student_engine.bkt.get_mastery_level(mastery),
-                'difficulty': TOPICS[current]['difficulty']
-            })
-            
-            visited.add(current)
-            
-            # Get next recommendation
-            try:
-                next_topic = student_engine.q_learner.recommend_next(
-                    current,
-                    student_engine.mastery_levels
-                )
-                
-                print(f"Step {i+1}: {current} -> {next_topic}")
-                
-                # Prevent infinite loop
-                if not next_topic or next_topic in visited:
-                    print(f"No new topic found, stopping")
-                    break
-                    
-                current = next_topic
-                
-            except Exception as e:
-                print(f"Error getting next topic: {e}")
-                break
-        
-        # If path is empty, add starting topic
-        if not path:
-            print("Path is empty, adding default")
-            path.append({
-                'topic': 'Variables',
-                'mastery': 0.1,
-                'level': 'Novice',
-                'difficulty': 1
+                'difficulty': TOPICS[topic]['difficulty']
             })
         
-        print(f"Final path: {[p['topic'] for p in path]}")
         return jsonify({'path': path})
         
     except Exception as e:
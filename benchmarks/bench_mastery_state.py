@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: progress writes per second, connection per call against pooled connections
+Also covers a new thread per write, the way Werkzeug's threaded server runs requests
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import mastery_state
+
+def save_per_call(db_path, student_name, mastery_levels, learning_style=None,
+                  mastery_timestamps=None):
+    """The previous save path: schema setup, connect, write, commit, close"""
+    conn = sqlite3.connect(db_path)
+    mastery_state._create_schema(conn)
+    conn.close()
+    
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        INSERT OR REPLACE INTO student_progress
+        (student_name, mastery_levels, learning_style, last_updated, mastery_timestamps)
+        VALUES (?, ?, ?, ?, ?)
+    """, (student_name, json.dumps(dict(mastery_levels)), learning_style, datetime.now(),
+          json.dumps(mastery_timestamps) if mastery_timestamps else None))
+    conn.commit()
+    conn.close()
+
+def run(save, writes, threads, mastery_levels):
+    """Time `writes` saves spread over `threads` threads"""
+    per_thread = writes // threads
+    
+    def work(t):
+        for i in range(per_thread):
+            save(f"student_{t}_{i % 100}", mastery_levels, 'visual', {'Variables': time.time()})
+    
+    workers = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed
+
+def run_thread_per_write(save, writes, mastery_levels):
+    """Time `writes` saves, each on a fresh short-lived thread"""
+    start = time.perf_counter()
+    for i in range(writes):
+        worker = threading.Thread(
+            target=save, args=(f"student_{i % 100}", mastery_levels, 'visual', {'Variables': time.time()})
+        )
+        worker.start()
+        worker.join()
+    return writes / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topics', default=os.path.join('data', 'topics_graph.json'))
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+    
+    with open(args.topics, 'r') as f:
+        mastery_levels = {topic: 0.1 for topic in json.load(f)}
+    
+    print("=" * 70)
+    print(" 💾 Progress Write Benchmark")
+    print("=" * 70)
+    print(f"   {'threads':>8} {'per-call writes/s':>18} {'pooled writes/s':>16} {'speedup':>8}")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for threads in args.threads:
+            before_path = os.path.join(tmp, f'before_{threads}.db')
+            before = run(
+                lambda *a: save_per_call(before_path, *a),
+                args.writes, threads, mastery_levels
+            )
+            
+            mastery_state.use_database(os.path.join(tmp, f'after_{threads}.db'))
+            after = run(mastery_state.save_student_progress, args.writes, threads, mastery_levels)
+            
+            print(f"   {threads:>8} {before:>18,.0f} {after:>16,.0f} {after / before:>7.2f}x")
+        
+        before_path = os.path.join(tmp, 'before_per_request.db')
+        before = run_thread_per_write(
+            lambda *a: save_per_call(before_path, *a), args.writes, mastery_levels
+        )
+        manager = mastery_state.use_database(os.path.join(tmp, 'after_per_request.db'))
+        after = run_thread_per_write(mastery_state.save_student_progress, args.writes, mastery_levels)
+        print(f"   {'per-req':>8} {before:>18,.0f} {after:>16,.0f} {after / before:>7.2f}x"
+              f"   ({manager.opened} connections opened)")
+
+if __name__ == '__main__':
+    main()
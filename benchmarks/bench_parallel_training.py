@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parallel actor-learner Q-Learning speedup against worker count
+
+Throughput is timed from the moment every actor has started, so process
+and shared memory setup is reported separately as startup.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.parallel_training import train_parallel
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topics', default=os.path.join('data', 'topics_graph.json'))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--batches', type=int, default=2)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    with open(args.topics, 'r') as f:
+        topics = json.load(f)
+    
+    print("=" * 70)
+    print(" ⚡ Parallel Q-Learning Benchmark")
+    print("=" * 70)
+    print(f"   CPUs available: {os.cpu_count()}")
+    print(f"   {'workers':>8} {'startup':>8} {'episodes':>10} {'seconds':>9} "
+          f"{'episodes/s':>12} {'speedup':>8}")
+    
+    baseline = None
+    for workers in args.workers:
+        stats, _ = train_parallel(
+            topics, workers=workers, rounds=args.rounds, n_batches=args.batches,
+            n_students=args.students, seed=args.seed
+        )
+        rate = stats['episodes_per_second']
+        baseline = baseline or rate
+        print(f"   {workers:>8} {stats['startup_seconds']:>7.2f}s {stats['episodes']:>10} "
+              f"{stats['seconds']:>9.2f} "
+              f"{rate:>12,.0f} {rate / baseline:>7.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,14 @@ Machine Learning Algorithms
 """
 
 from .bkt import BayesianKnowledgeTracing
-from .q_learning import QLearningRecommender
+from .q_learning import QLearningRecommender, SharedQLearningRecommender
 from .clustering import LearningStyleClassifier
 from .recommender import IntelliLearnEngine
 
 __all__ = [
     'BayesianKnowledgeTracing',
     'QLearningRecommender',
+    'SharedQLearningRecommender',
     'LearningStyleClassifier',
     'IntelliLearnEngine'
 ]
@@ -3,6 +3,13 @@ Bayesian Knowledge Tracing (BKT) Implementation
 Estimates student mastery probability for each topic
 """
 
+from functools import lru_cache
+
+import numpy as np
+
+MASTERY_LEVELS = np.array(["Novice", "Beginner", "Developing", "Proficient", "Expert"])
+MASTERY_THRESHOLDS = np.array([0.2, 0.4, 0.6, 0.8])
+
 class BayesianKnowledgeTracing:
     def __init__(self, p_init=0.1, p_learn=0.3, p_slip=0.1, p_guess=0.25):
         """
@@ -53,6 +60,177 @@ class BayesianKnowledgeTracing:
         # Bound between 0 and 1
         return max(0.0, min(1.0, updated))
     
+    def update_mastery_batch(self, current_mastery, is_correct,
+                             p_learn=None, p_slip=None, p_guess=None):
+        """
+        Vectorized version of update_mastery for many responses at once
+        
+        Args:
+            current_mastery: Array of current mastery levels (0-1)
+            is_correct: Boolean array, one entry per mastery value
+            p_learn: Optional per-row learning rates (defaults to self.p_learn)
+            p_slip: Optional per-row slip probabilities (defaults to self.p_slip)
+            p_guess: Optional per-row guess probabilities (defaults to self.p_guess)
+            
+        Returns:
+            np.ndarray: Updated mastery probabilities (0-1)
+        """
+        p_know = np.asarray(current_mastery, dtype=np.float64)
+        correct = np.asarray(is_correct, dtype=bool)
+        p_learn = self.p_learn if p_learn is None else np.asarray(p_learn, dtype=np.float64)
+        p_slip = self.p_slip if p_slip is None else np.asarray(p_slip, dtype=np.float64)
+        p_guess = self.p_guess if p_guess is None else np.asarray(p_guess, dtype=np.float64)
+        
+        # Bayes' rule for both outcomes, then pick per row
+        evidence = np.where(
+            correct,
+            p_know * (1 - p_slip),
+            p_know * p_slip
+        )
+        p_observed = evidence + np.where(
+            correct,
+            (1 - p_know) * p_guess,
+            (1 - p_know) * (1 - p_guess)
+        )
+        
+        # Keep the prior wherever the observation had zero probability
+        positive = p_observed > 0
+        new_p_know = np.where(
+            positive,
+            evidence / np.where(positive, p_observed, 1.0),
+            p_know
+        )
+        
+        # Apply learning effect
+        updated = new_p_know + p_learn * (1 - new_p_know)
+        
+        # Bound between 0 and 1
+        return np.clip(updated, 0.0, 1.0)
+    
+    def predict_correct(self, mastery):
+        """
+        Probability that the next answer is correct
+        
+        Args:
+            mastery: Current mastery level (0-1)
+        
+        Returns:
+            float: P(correct)
+        """
+        return mastery * (1 - self.p_slip) + (1 - mastery) * self.p_guess
+    
+    def predict_correct_batch(self, mastery, p_slip=None, p_guess=None):
+        """
+        Vectorized predict_correct over arrays of any shape
+        
+        Per-topic parameters broadcast against the last axis, so a
+        students x topics matrix takes p_slip/p_guess vectors of length T.
+        
+        Args:
+            mastery: Array of mastery levels (0-1), e.g. students x topics
+            p_slip: Optional slip probabilities (defaults to self.p_slip)
+            p_guess: Optional guess probabilities (defaults to self.p_guess)
+        
+        Returns:
+            np.ndarray: P(correct) with the same shape as mastery
+        """
+        mastery = np.asarray(mastery, dtype=np.float64)
+        p_slip = self.p_slip if p_slip is None else np.asarray(p_slip, dtype=np.float64)
+        p_guess = self.p_guess if p_guess is None else np.asarray(p_guess, dtype=np.float64)
+        return p_guess + mastery * (1 - p_slip - p_guess)
+    
+    def _update_map(self, is_correct):
+        """
+        One BKT update written as a linear fractional map
+        
+        update_mastery(p) == (a*p + b) / (c*p + d) for [[a, b], [c, d]], so
+        k identical updates compose into the k-th power of this matrix.
+        """
+        L, s, g = self.p_learn, self.p_slip, self.p_guess
+        if is_correct:
+            return ((L * (1 - s - g) + (1 - L) * (1 - s), L * g),
+                    (1 - s - g, g))
+        return ((L * (s + g - 1) + (1 - L) * s, L * (1 - g)),
+                (s + g - 1, 1 - g))
+    
+    def _run_powers(self, is_correct, k):
+        """Cached M^(2^j) matrices covering every bit of k"""
+        return _map_powers(self._update_map(is_correct), max(int(k).bit_length(), 1))
+    
+    def update_mastery_run(self, current_mastery, is_correct, k):
+        """
+        Apply k identical responses in O(log k) instead of k update_mastery calls
+        
+        Args:
+            current_mastery: Current mastery level (0-1)
+            is_correct: Outcome shared by all k responses
+            k: Number of consecutive responses with that outcome
+        
+        Returns:
+            float: Mastery after the k updates (0-1)
+        """
+        k = int(k)
+        if k <= 0:
+            return current_mastery
+        
+        # First step goes through the guarded scalar update, which only
+        # leaves a zero-probability observation at a fixed point
+        p_know = self.update_mastery(current_mastery, is_correct)
+        k -= 1
+        
+        for bit, ((a, b), (c, d)) in enumerate(self._run_powers(is_correct, k)):
+            if k >> bit & 1:
+                denominator = c * p_know + d
+                if denominator > 0:
+                    p_know = (a * p_know + b) / denominator
+        
+        return max(0.0, min(1.0, p_know))
+    
+    def update_mastery_run_batch(self, current_mastery, is_correct, k):
+        """
+        Vectorized version of update_mastery_run
+        
+        Args:
+            current_mastery: Array of current mastery levels (0-1)
+            is_correct: Boolean array of run outcomes
+            k: Integer array of run lengths
+        
+        Returns:
+            np.ndarray: Mastery after each run (0-1)
+        """
+        p_know = np.asarray(current_mastery, dtype=np.float64)
+        correct = np.asarray(is_correct, dtype=bool)
+        k = np.asarray(k, dtype=np.int64)
+        
+        active = k > 0
+        p_know = np.where(active, self.update_mastery_batch(p_know, correct), p_know)
+        remaining = np.where(active, k - 1, 0)
+        
+        n_bits = int(remaining.max()).bit_length() if remaining.size else 0
+        correct_powers = self._run_powers(True, 2 ** n_bits - 1)
+        incorrect_powers = self._run_powers(False, 2 ** n_bits - 1)
+        
+        for bit in range(n_bits):
+            apply = (remaining >> bit & 1).astype(bool)
+            if not apply.any():
+                continue
+            (a1, b1), (c1, d1) = correct_powers[bit]
+            (a0, b0), (c0, d0) = incorrect_powers[bit]
+            a = np.where(correct, a1, a0)
+            b = np.where(correct, b1, b0)
+            c = np.where(correct, c1, c0)
+            d = np.where(correct, d1, d0)
+            
+            denominator = c * p_know + d
+            positive = apply & (denominator > 0)
+            p_know = np.where(
+                positive,
+                (a * p_know + b) / np.where(positive, denominator, 1.0),
+                p_know
+            )
+        
+        return np.clip(p_know, 0.0, 1.0)
+    
     def get_mastery_level(self, mastery):
         """Get descriptive mastery level"""
         if mastery >= 0.8:
@@ -65,3 +243,36 @@ class BayesianKnowledgeTracing:
             return "Beginner"
         else:
             return "Novice"
+    
+    def get_mastery_level_batch(self, mastery):
+        """
+        Vectorized version of get_mastery_level
+        
+        Args:
+            mastery: Array of mastery levels (0-1)
+            
+        Returns:
+            np.ndarray: Array of descriptive mastery level names
+        """
+        buckets = np.searchsorted(
+            MASTERY_THRESHOLDS, np.asarray(mastery, dtype=np.float64), side='right'
+        )
+        return MASTERY_LEVELS[buckets]
+
+
+@lru_cache(maxsize=256)
+def _map_powers(matrix, n_bits):
+    """
+    Repeated squares M, M^2, M^4, ... of a 2x2 update map
+    
+    Each power is rescaled since a linear fractional map is unchanged by
+    scaling its matrix, which keeps long runs from overflowing.
+    """
+    powers = []
+    (a, b), (c, d) = matrix
+    for _ in range(n_bits):
+        scale = max(abs(a), abs(b), abs(c), abs(d)) or 1.0
+        a, b, c, d = a / scale, b / scale, c / scale, d / scale
+        powers.append(((a, b), (c, d)))
+        a, b, c, d = a * a + b * c, a * b + b * d, c * a + d * c, c * b + d * d
+    return tuple(powers)
@@ -0,0 +1,324 @@
+"""
+Expectation-Maximization (Baum-Welch) Fitting for BKT Parameters
+Learns p_init, p_learn, p_slip and p_guess per topic from response logs
+"""
+
+import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .bkt import BayesianKnowledgeTracing
+
+PARAMS_PATH = os.path.join('data', 'bkt_params.json')
+
+# Keep parameters away from degenerate values where the model is not identifiable
+PARAM_BOUNDS = {
+    'p_init': (1e-4, 1 - 1e-4),
+    'p_learn': (1e-4, 1 - 1e-4),
+    'p_slip': (1e-4, 0.5),
+    'p_guess': (1e-4, 0.5)
+}
+
+# Topics with less data keep the default parameters; EM on a handful of
+# answers runs straight into the PARAM_BOUNDS clip values
+MIN_RESPONSES = 200
+MIN_SEQUENCES = 20
+
+def collect_sequences(events):
+    """
+    Group a stream of response events into per-topic, per-student sequences
+    
+    Args:
+        events: Iterable of response event dicts in chronological order
+    
+    Returns:
+        dict: {topic: (observations, lengths)} with observations as a flat
+              int8 array of 0/1 outcomes and lengths as one entry per student
+    """
+    grouped = {}
+    for event in events:
+        per_student = grouped.setdefault(event['topic'], {})
+        seq = per_student.get(event['student_name'])
+        if seq is None:
+            seq = per_student[event['student_name']] = array('b')
+        seq.append(1 if event['is_correct'] else 0)
+    
+    sequences = {}
+    for topic, per_student in grouped.items():
+        lengths = np.fromiter(
+            (len(seq) for seq in per_student.values()),
+            dtype=np.int64, count=len(per_student)
+        )
+        observations = np.empty(int(lengths.sum()), dtype=np.int8)
+        offset = 0
+        for seq in per_student.values():
+            observations[offset:offset + len(seq)] = np.frombuffer(seq, dtype=np.int8)
+            offset += len(seq)
+        sequences[topic] = (observations, lengths)
+    return sequences
+
+def _pad_batches(observations, lengths, max_cells):
+    """
+    Pack sequences into padded matrices of similar-length rows
+    
+    Sorting by length keeps padding small, and max_cells bounds the
+    working memory of a single forward-backward pass.
+    """
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    order = np.argsort(-lengths, kind='stable')
+    
+    batches = []
+    i = 0
+    while i < len(order):
+        width = int(lengths[order[i]])
+        rows = max(1, max_cells // max(width, 1))
+        idx = order[i:i + rows]
+        
+        obs = np.zeros((len(idx), width), dtype=np.int8)
+        mask = np.zeros((len(idx), width), dtype=bool)
+        for r, j in enumerate(idx):
+            n = int(lengths[j])
+            obs[r, :n] = observations[starts[j]:starts[j] + n]
+            mask[r, :n] = True
+        batches.append((obs, mask))
+        i += rows
+    return batches
+
+def _expected_counts(obs, mask, p_init, p_learn, p_slip, p_guess):
+    """
+    Scaled forward-backward over a padded batch of sequences
+    
+    Hidden state 0 is "unknown" and 1 is "known"; padded positions emit
+    with probability 1 so they leave the likelihood untouched.
+    
+    Returns:
+        tuple: (counts dict, log-likelihood)
+    """
+    n_rows, width = obs.shape
+    correct = obs == 1
+    
+    # Emission probabilities per state, 1 where there is no observation
+    e_known = np.where(mask, np.where(correct, 1 - p_slip, p_slip), 1.0)
+    e_unknown = np.where(mask, np.where(correct, p_guess, 1 - p_guess), 1.0)
+    
+    # Forward pass
+    alpha_known = np.empty((n_rows, width))
+    alpha_unknown = np.empty((n_rows, width))
+    scale = np.empty((n_rows, width))
+    
+    a_unknown = (1 - p_init) * e_unknown[:, 0]
+    a_known = p_init * e_known[:, 0]
+    for t in range(width):
+        if t > 0:
+            prev_unknown = a_unknown
+            a_unknown = prev_unknown * (1 - p_learn) * e_unknown[:, t]
+            a_known = (prev_unknown * p_learn + a_known) * e_known[:, t]
+        c = a_unknown + a_known
+        a_unknown = a_unknown / c
+        a_known = a_known / c
+        alpha_unknown[:, t] = a_unknown
+        alpha_known[:, t] = a_known
+        scale[:, t] = c
+    
+    # Backward pass
+    beta_known = np.ones((n_rows, width))
+    beta_unknown = np.ones((n_rows, width))
+    for t in range(width - 2, -1, -1):
+        x_known = e_known[:, t + 1] * beta_known[:, t + 1] / scale[:, t + 1]
+        x_unknown = e_unknown[:, t + 1] * beta_unknown[:, t + 1] / scale[:, t + 1]
+        beta_unknown[:, t] = (1 - p_learn) * x_unknown + p_learn * x_known
+        beta_known[:, t] = x_known
+    
+    gamma_known = alpha_known * beta_known
+    gamma_unknown = alpha_unknown * beta_unknown
+    
+    # Expected unknown -> known transitions between consecutive observations
+    step = mask[:, 1:]
+    xi_learn = (
+        alpha_unknown[:, :-1] * p_learn * e_known[:, 1:] * beta_known[:, 1:]
+        / scale[:, 1:]
+    )
+    
+    counts = {
+        'init_known': gamma_known[:, 0].sum(),
+        'sequences': n_rows,
+        'learn_num': xi_learn[step].sum(),
+        'learn_den': gamma_unknown[:, :-1][step].sum(),
+        'slip_num': gamma_known[mask & ~correct].sum(),
+        'slip_den': gamma_known[mask].sum(),
+        'guess_num': gamma_unknown[mask & correct].sum(),
+        'guess_den': gamma_unknown[mask].sum()
+    }
+    return counts, np.log(scale[mask]).sum()
+
+def fit_topic(observations, lengths, p_init=0.1, p_learn=0.3, p_slip=0.1,
+              p_guess=0.25, max_iter=100, tol=1e-4, max_cells=2_000_000):
+    """
+    Fit BKT parameters for one topic with EM over all student sequences
+    
+    Args:
+        observations: Flat int8 array of 0/1 outcomes, students concatenated
+        lengths: Number of responses per student
+        p_init, p_learn, p_slip, p_guess: Starting parameters
+        max_iter: Maximum number of EM iterations
+        tol: Stop once the log-likelihood improves by less than this
+        max_cells: Upper bound on padded cells per forward-backward batch
+    
+    Returns:
+        dict: Fitted parameters plus log_likelihood, iterations and n_responses
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    observations = np.asarray(observations, dtype=np.int8)
+    batches = _pad_batches(observations, lengths[lengths > 0], max_cells)
+    
+    params = {'p_init': p_init, 'p_learn': p_learn, 'p_slip': p_slip, 'p_guess': p_guess}
+    log_likelihood = -np.inf
+    iterations = 0
+    
+    for iterations in range(1, max_iter + 1):
+        totals = {}
+        new_log_likelihood = 0.0
+        for obs, mask in batches:
+            counts, ll = _expected_counts(obs, mask, **params)
+            new_log_likelihood += ll
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0.0) + value
+        
+        estimates = {
+            'p_init': totals['init_known'] / max(totals['sequences'], 1),
+            'p_learn': totals['learn_num'] / totals['learn_den'] if totals['learn_den'] > 0 else params['p_learn'],
+            'p_slip': totals['slip_num'] / totals['slip_den'] if totals['slip_den'] > 0 else params['p_slip'],
+            'p_guess': totals['guess_num'] / totals['guess_den'] if totals['guess_den'] > 0 else params['p_guess']
+        }
+        params = {
+            key: float(np.clip(value, *PARAM_BOUNDS[key]))
+            for key, value in estimates.items()
+        }
+        
+        converged = new_log_likelihood - log_likelihood < tol
+        log_likelihood = new_log_likelihood
+        if converged:
+            break
+    
+    params.update({
+        'log_likelihood': float(log_likelihood),
+        'iterations': iterations,
+        'n_responses': int(lengths.sum())
+    })
+    return params
+
+def _fit_topic_job(job):
+    """Process pool entry point"""
+    topic, observations, lengths, options = job
+    return topic, fit_topic(observations, lengths, **options)
+
+def fit_topics(sequences, processes=None, min_responses=MIN_RESPONSES,
+               min_sequences=MIN_SEQUENCES, **options):
+    """
+    Fit every topic in parallel with a process pool
+    
+    Args:
+        sequences: {topic: (observations, lengths)} as built by collect_sequences
+        processes: Worker count (defaults to the CPU count, 1 disables the pool)
+        min_responses: Topics with fewer responses are left out
+        min_sequences: Topics answered by fewer students are left out
+        **options: Extra keyword arguments forwarded to fit_topic
+    
+    Returns:
+        dict: {topic: fitted parameter dict}, without the left-out topics
+    """
+    jobs = [
+        (topic, observations, lengths, options)
+        for topic, (observations, lengths) in sequences.items()
+        if len(observations) >= min_responses
+        and np.count_nonzero(lengths) >= min_sequences
+    ]
+    # Biggest topics first so a single large topic does not finish last
+    jobs.sort(key=lambda job: len(job[1]), reverse=True)
+    
+    if processes == 1 or len(jobs) <= 1:
+        return dict(_fit_topic_job(job) for job in jobs)
+    
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return dict(pool.map(_fit_topic_job, jobs))
+
+def save_parameter_table(params, filepath=PARAMS_PATH):
+    """Save fitted per-topic parameters to JSON"""
+    with open(filepath, 'w') as f:
+        json.dump(params, f, indent=2, sort_keys=True)
+
+def load_parameter_table(filepath=PARAMS_PATH):
+    """
+    Load a per-topic parameter table
+    
+    Fitted entries whose n_responses is below MIN_RESPONSES are ignored,
+    so those topics use the default parameters.
+    
+    Returns:
+        dict: {topic: {p_init, p_learn, p_slip, p_guess}}, empty if missing
+    """
+    if not os.path.exists(filepath):
+        return {}
+    
+    with open(filepath, 'r') as f:
+        table = json.load(f)
+    
+    return {
+        topic: {key: float(values[key]) for key in PARAM_BOUNDS if key in values}
+        for topic, values in table.items()
+        if values.get('n_responses', MIN_RESPONSES) >= MIN_RESPONSES
+    }
+
+def build_topic_models(params):
+    """
+    Create one BayesianKnowledgeTracing instance per topic in a parameter table
+    
+    Keys other than the four BKT parameters (e.g. fit diagnostics) are ignored.
+    """
+    return {
+        topic: BayesianKnowledgeTracing(**{
+            key: float(values[key]) for key in PARAM_BOUNDS if key in values
+        })
+        for topic, values in params.items()
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+    
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.mastery_state import DB_PATH
+    from utils.response_log import iter_responses
+    
+    parser = argparse.ArgumentParser(description='Fit per-topic BKT parameters with EM')
+    parser.add_argument('--source', default=DB_PATH, help='Response log (.jsonl or SQLite)')
+    parser.add_argument('--output', default=PARAMS_PATH, help='Parameter table to write')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--max-iter', type=int, default=100)
+    parser.add_argument('--min-responses', type=int, default=MIN_RESPONSES)
+    parser.add_argument('--min-sequences', type=int, default=MIN_SEQUENCES)
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    sequences = collect_sequences(iter_responses(args.source))
+    total = sum(len(obs) for obs, _ in sequences.values())
+    print(f"📚 Loaded {total} responses across {len(sequences)} topics")
+    
+    fitted = fit_topics(
+        sequences, processes=args.processes, max_iter=args.max_iter,
+        min_responses=args.min_responses, min_sequences=args.min_sequences
+    )
+    save_parameter_table(fitted, args.output)
+    
+    elapsed = time.perf_counter() - start
+    for topic, values in sorted(fitted.items()):
+        print(f"   {topic}: init={values['p_init']:.3f} learn={values['p_learn']:.3f} "
+              f"slip={values['p_slip']:.3f} guess={values['p_guess']:.3f}")
+    for topic in sorted(set(sequences) - set(fitted)):
+        print(f"   {topic}: too little data, keeping default parameters")
+    print(f"✓ Saved {args.output} in {elapsed:.1f}s")
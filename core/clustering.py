@@ -3,14 +3,433 @@ K-Means Clustering for Learning Style Identification
 Analyzes student behavior to determine learning preference
 """
 
+import itertools
+import json
+import os
+import threading
+from contextlib import nullcontext
+
+import numpy as np
+
+STYLE_MODEL_PATH = os.path.join('data', 'style_centroids.json')
+
+# Feature vector layout shared by extract_features, the model and the database
+FEATURE_NAMES = ('avg_time', 'avg_attempts', 'accuracy')
+
+def rule_styles(features):
+    """
+    Vectorized form of the hand-written style rules
+    
+    Args:
+        features: n x 3 array in FEATURE_NAMES order
+    
+    Returns:
+        np.ndarray: Style name per row
+    """
+    features = np.atleast_2d(features)
+    avg_time, avg_attempts, accuracy = features.T
+    return np.select(
+        [(avg_time < 30) & (accuracy > 0.7), avg_attempts > 2],
+        ['visual', 'practical'],
+        'conceptual'
+    )
+
+class MiniBatchKMeans:
+    """K-Means trained on minibatches streamed from chunked feature sources"""
+    
+    def __init__(self, k=3, batch_size=1024, seed=None):
+        """
+        Initialize the model
+        
+        Args:
+            k: Number of clusters
+            batch_size: Rows per centroid update
+            seed: Seed for initialization and shuffling
+        """
+        self.k = k
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.mean = None
+        self.scale = None
+        self.centroids = None
+        self.counts = None
+    
+    def _standardize(self, features):
+        return (features - self.mean) / self.scale
+    
+    def _fit_scaling(self, chunks):
+        """One pass of running sums for per-feature mean and std"""
+        n, total, total_sq = 0, 0.0, 0.0
+        for chunk in chunks:
+            n += len(chunk)
+            total = total + chunk.sum(axis=0)
+            total_sq = total_sq + (chunk ** 2).sum(axis=0)
+        if n == 0:
+            raise ValueError("No feature vectors to cluster")
+        self.mean = total / n
+        std = np.sqrt(np.maximum(total_sq / n - self.mean ** 2, 0))
+        self.scale = np.where(std > 0, std, 1.0)
+    
+    def _init_centroids(self, sample):
+        """k-means++ seeding on one standardized chunk"""
+        centroids = [sample[self.rng.integers(len(sample))]]
+        for _ in range(1, self.k):
+            dist = ((sample[:, None, :] - np.array(centroids)[None]) ** 2).sum(axis=2).min(axis=1)
+            total = dist.sum()
+            if total == 0:
+                centroids.append(sample[self.rng.integers(len(sample))])
+            else:
+                centroids.append(sample[self.rng.choice(len(sample), p=dist / total)])
+        self.centroids = np.array(centroids)
+        self.counts = np.zeros(self.k)
+    
+    def assign(self, features):
+        """
+        Nearest centroid of each standardized row
+        
+        Returns:
+            tuple: (cluster index per row, squared distance per row)
+        """
+        dist = ((features[:, None, :] - self.centroids[None]) ** 2).sum(axis=2)
+        labels = dist.argmin(axis=1)
+        return labels, dist[np.arange(len(features)), labels]
+    
+    def partial_fit(self, features):
+        """
+        Update the centroids with one minibatch of standardized rows
+        
+        Each centroid moves to the running mean of every row ever assigned
+        to it, so its per-row learning rate decays as 1 / count.
+        
+        Returns:
+            float: Mean squared distance of the batch before the update
+        """
+        labels, dist = self.assign(features)
+        batch_counts = np.bincount(labels, minlength=self.k)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, labels, features)
+        
+        self.counts += batch_counts
+        touched = batch_counts > 0
+        self.centroids[touched] += (
+            sums[touched] - batch_counts[touched, None] * self.centroids[touched]
+        ) / self.counts[touched, None]
+        return float(dist.mean())
+    
+    def fit(self, chunk_source, epochs=10):
+        """
+        Fit on a population too large to hold in memory
+        
+        Args:
+            chunk_source: Callable returning a fresh iterable of n x d
+                          feature arrays on every call
+            epochs: Passes over the source after the scaling pass
+        
+        Returns:
+            dict: Rows per epoch and the mean squared distance per epoch
+        """
+        self._fit_scaling(chunk_source())
+        history = []
+        for _ in range(epochs):
+            total, rows = 0.0, 0
+            for chunk in chunk_source():
+                chunk = self._standardize(chunk)
+                if self.centroids is None:
+                    self._init_centroids(chunk)
+                order = self.rng.permutation(len(chunk))
+                for i in range(0, len(chunk), self.batch_size):
+                    batch = chunk[order[i:i + self.batch_size]]
+                    total += self.partial_fit(batch) * len(batch)
+                    rows += len(batch)
+            history.append(total / rows if rows else 0.0)
+        return {'rows': rows, 'epochs': epochs, 'inertia': history}
+
+class FeatureAccumulator:
+    """Running behavioral features, updated in O(1) per response"""
+    
+    def __init__(self, ewma_alpha=0.1):
+        """
+        Initialize empty running sums
+        
+        Args:
+            ewma_alpha: Weight of the newest response in the exponentially
+                        weighted averages (0-1)
+        """
+        self.ewma_alpha = ewma_alpha
+        self.count = 0
+        self.total_time = 0.0
+        self.total_attempts = 0
+        self.correct_count = 0
+        self.ewma = None
+    
+    def __len__(self):
+        return self.count
+    
+    def add(self, time_spent=30, attempts=1, is_correct=False):
+        """
+        Fold one response into the running features
+        
+        Args:
+            time_spent: Time spent on the question (seconds)
+            attempts: Number of attempts made
+            is_correct: Whether the answer was correct
+        """
+        self.count += 1
+        self.total_time += time_spent
+        self.total_attempts += attempts
+        self.correct_count += bool(is_correct)
+        
+        sample = {'avg_time': time_spent, 'avg_attempts': attempts, 'accuracy': float(bool(is_correct))}
+        if self.ewma is None:
+            self.ewma = sample
+        else:
+            a = self.ewma_alpha
+            self.ewma = {k: (1 - a) * self.ewma[k] + a * v for k, v in sample.items()}
+    
+    def add_response(self, response):
+        """Fold in one response dictionary"""
+        self.add(
+            response.get('time_spent', 30),
+            response.get('attempts', 1),
+            response.get('is_correct', False)
+        )
+    
+    def to_dict(self):
+        """Get the running sums as a JSON-serializable dict"""
+        return {
+            'count': self.count,
+            'total_time': self.total_time,
+            'total_attempts': self.total_attempts,
+            'correct_count': self.correct_count,
+            'ewma': self.ewma
+        }
+    
+    def load_dict(self, state):
+        """Restore running sums saved by to_dict"""
+        self.count = state['count']
+        self.total_time = state['total_time']
+        self.total_attempts = state['total_attempts']
+        self.correct_count = state['correct_count']
+        self.ewma = state['ewma']
+    
+    def features(self, weighted=False):
+        """
+        Get the feature summary extract_features would compute
+        
+        Args:
+            weighted: Return the exponentially weighted averages instead,
+                      which follow recent behavior
+            
+        Returns:
+            dict: Feature summary
+        """
+        if not self.count:
+            return {'avg_time': 30, 'avg_attempts': 1, 'accuracy': 0.5}
+        if weighted:
+            return dict(self.ewma)
+        return {
+            'avg_time': self.total_time / self.count,
+            'avg_attempts': self.total_attempts / self.count,
+            'accuracy': self.correct_count / self.count
+        }
+
 class LearningStyleClassifier:
-    def __init__(self):
-        """Initialize learning style classifier"""
+    def __init__(self, model_path=None):
+        """
+        Initialize learning style classifier
+        
+        Args:
+            model_path: Optional centroid file written by save_model; without
+                        one the hand-written rules classify every student
+        """
         self.styles = {
             'visual': 0,
             'practical': 1,
             'conceptual': 2
         }
+        
+        # Population K-Means model in standardized feature space
+        self.mean = None
+        self.scale = None
+        self.centroids = None
+        self.centroid_styles = None
+        self.counts = None
+        if model_path and os.path.exists(model_path):
+            self.load_model(model_path)
+        
+        # Online mode (see enable_online)
+        self.online = False
+        self.snapshot_path = None
+        self.snapshot_every = 1000
+        self.min_learning_rate = 0.0
+        self._centroid_locks = []
+        self._snapshot_lock = threading.Lock()
+        self._updates = itertools.count(1)
+    
+    def enable_online(self, snapshot_path=STYLE_MODEL_PATH, snapshot_every=1000,
+                      min_learning_rate=0.001):
+        """
+        Keep adapting the trained centroids as responses arrive
+        
+        Args:
+            snapshot_path: File the centroids are periodically saved to
+                           (None disables snapshots)
+            snapshot_every: Online updates between snapshots
+            min_learning_rate: Floor of the decaying 1 / count learning
+                               rate, so centroids can still follow drift
+        """
+        if self.centroids is None:
+            raise ValueError("Online K-Means needs trained centroids; run fit_population first")
+        self.snapshot_path = snapshot_path
+        self.snapshot_every = snapshot_every
+        self.min_learning_rate = min_learning_rate
+        self._centroid_locks = [threading.Lock() for _ in range(len(self.centroids))]
+        self.online = True
+    
+    def update_online(self, features, previous=None):
+        """
+        Move one student's point in the online centroids, O(k·d)
+        
+        Every student counts once. The first update adds the student's
+        point to the nearest centroid; later updates replace the point the
+        previous call returned, so a student who answers often does not
+        drag the centroids further with each answer.
+        
+        The nearest centroid is found without locking; only the rows being
+        moved are locked, so concurrent updates to different centroids never
+        wait on each other.
+        
+        Args:
+            features: Feature dict or FeatureAccumulator of one student
+            previous: The student's (centroid index, point) returned by the
+                      last call, or None for a student not yet counted
+            
+        Returns:
+            tuple: (centroid index, standardized point as a list) to pass
+                   back as previous next time, or None when offline
+        """
+        if not self.online:
+            return None
+        if isinstance(features, FeatureAccumulator):
+            features = features.features()
+        
+        x = (np.array([features[name] for name in FEATURE_NAMES]) - self.mean) / self.scale
+        nearest = int(((self.centroids - x) ** 2).sum(axis=1).argmin())
+        
+        if previous is not None and previous[0] == nearest:
+            # Same cluster: shift the centroid by this student's share of the move
+            with self._centroid_locks[nearest]:
+                rate = max(1.0 / max(self.counts[nearest], 1.0), self.min_learning_rate)
+                self.centroids[nearest] += rate * (x - np.asarray(previous[1]))
+        else:
+            if previous is not None:
+                # Take the student's old point out of its former centroid
+                old, old_x = previous[0], np.asarray(previous[1])
+                with self._centroid_locks[old]:
+                    if self.counts[old] > 1:
+                        self.centroids[old] += (self.centroids[old] - old_x) / (self.counts[old] - 1)
+                        self.counts[old] -= 1
+            with self._centroid_locks[nearest]:
+                self.counts[nearest] += 1
+                rate = max(1.0 / self.counts[nearest], self.min_learning_rate)
+                self.centroids[nearest] += rate * (x - self.centroids[nearest])
+        
+        if self.snapshot_path and next(self._updates) % self.snapshot_every == 0:
+            self.snapshot()
+        return nearest, x.tolist()
+    
+    def snapshot(self):
+        """
+        Save the current centroids to snapshot_path
+        
+        Returns:
+            bool: False if another thread is already writing a snapshot
+        """
+        if not self._snapshot_lock.acquire(blocking=False):
+            return False
+        try:
+            self.save_model(self.snapshot_path)
+            return True
+        finally:
+            self._snapshot_lock.release()
+    
+    def fit_population(self, chunk_source, k=3, batch_size=1024, epochs=10, seed=None):
+        """
+        Train the K-Means model on the whole student population
+        
+        Each centroid is named after the style the rules give its
+        (unstandardized) center, so clusters keep human-readable labels.
+        
+        Args:
+            chunk_source: Callable returning a fresh iterable of n x 3
+                          feature arrays (see utils.response_log.iter_student_features)
+            k: Number of clusters
+            batch_size: Rows per centroid update
+            epochs: Passes over the population
+            seed: Random seed
+        
+        Returns:
+            dict: Training statistics
+        """
+        model = MiniBatchKMeans(k, batch_size, seed)
+        stats = model.fit(chunk_source, epochs)
+        self.mean = model.mean
+        self.scale = model.scale
+        self.centroids = model.centroids
+        # Per epoch, so a trained student weighs as much as one online student
+        self.counts = model.counts / max(epochs, 1)
+        self.centroid_styles = rule_styles(self.centroids * self.scale + self.mean)
+        return stats
+    
+    def save_model(self, filepath=STYLE_MODEL_PATH):
+        """Save the centroids and feature scaling to JSON"""
+        centroids, counts = [], []
+        for i in range(len(self.centroids)):
+            # Copy each row under its lock so a snapshot never holds a half-moved centroid
+            with self._centroid_locks[i] if self._centroid_locks else nullcontext():
+                centroids.append(self.centroids[i].tolist())
+                counts.append(float(self.counts[i]))
+        
+        model = {
+            'features': list(FEATURE_NAMES),
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist(),
+            'centroids': centroids,
+            'styles': self.centroid_styles.tolist(),
+            'counts': counts
+        }
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(model, f, indent=2)
+        os.replace(tmp_path, filepath)
+    
+    def load_model(self, filepath=STYLE_MODEL_PATH):
+        """Load centroids written by save_model"""
+        with open(filepath, 'r') as f:
+            model = json.load(f)
+        self.mean = np.array(model['mean'])
+        self.scale = np.array(model['scale'])
+        self.centroids = np.array(model['centroids'])
+        self.centroid_styles = np.array(model['styles'])
+        self.counts = np.array(model.get('counts', np.zeros(len(self.centroids))), dtype=np.float64)
+    
+    def predict_batch(self, features):
+        """
+        Assign styles to many students at once
+        
+        Args:
+            features: n x 3 array in FEATURE_NAMES order
+        
+        Returns:
+            np.ndarray: Style name per student
+        """
+        features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        if self.centroids is None:
+            return rule_styles(features)
+        
+        standardized = (features - self.mean) / self.scale
+        dist = ((standardized[:, None, :] - self.centroids[None]) ** 2).sum(axis=2)
+        return self.centroid_styles[dist.argmin(axis=1)]
     
     def extract_features(self, responses):
         """
@@ -40,7 +459,8 @@ class LearningStyleClassifier:
         Predict learning style from response patterns
         
         Args:
-            responses: List of student responses
+            responses: List of student responses, or a FeatureAccumulator
+                       holding their running features
             
         Returns:
             str: Learning style ('visual', 'practical', 'conceptual')
@@ -48,7 +468,13 @@ class LearningStyleClassifier:
         if len(responses) < 3:
             return 'visual'  # Default
         
-        features = self.extract_features(responses)
+        if isinstance(responses, FeatureAccumulator):
+            features = responses.features()
+        else:
+            features = self.extract_features(responses)
+        
+        if self.centroids is not None:
+            return str(self.predict_batch([[features[name] for name in FEATURE_NAMES]])[0])
         
         avg_time = features['avg_time']
         avg_attempts = features['avg_attempts']
@@ -117,3 +543,34 @@ class LearningStyleClassifier:
             }
         }
         return descriptions.get(style, descriptions['visual'])
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.mastery_state import DB_PATH
+    from utils.response_log import iter_student_features
+    
+    parser = argparse.ArgumentParser(description='Cluster the student population into learning styles')
+    parser.add_argument('--source', default=DB_PATH, help='SQLite database with the response log')
+    parser.add_argument('--output', default=STYLE_MODEL_PATH, help='Centroid file to write')
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    
+    def chunks():
+        return (features for _, features in iter_student_features(args.source, args.chunk_size))
+    
+    classifier = LearningStyleClassifier()
+    stats = classifier.fit_population(chunks, k=args.k, epochs=args.epochs, seed=args.seed)
+    classifier.save_model(args.output)
+    
+    print(f"🎨 Clustered {stats['rows']} students into {args.k} styles")
+    for center, style in zip(classifier.centroids * classifier.scale + classifier.mean,
+                             classifier.centroid_styles):
+        print(f"   {style}: " + ", ".join(f"{n}={v:.2f}" for n, v in zip(FEATURE_NAMES, center)))
+    print(f"✓ Saved {args.output}")
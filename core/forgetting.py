@@ -0,0 +1,40 @@
+"""
+Time-Decay (Forgetting) Model for Mastery
+Decay is evaluated lazily from the elapsed time since the last update
+"""
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400.0
+
+class ForgettingModel:
+    def __init__(self, half_life_days=14.0):
+        """
+        Initialize exponential forgetting
+        
+        Args:
+            half_life_days: Days after which the mastery above the floor halves
+        """
+        if half_life_days <= 0:
+            raise ValueError("half_life_days must be positive")
+        self.half_life_days = half_life_days
+        self.half_life = half_life_days * SECONDS_PER_DAY
+    
+    def decay(self, mastery, elapsed, floor=0.0):
+        """
+        Decay mastery toward a floor after some idle time
+        
+        Works on floats and NumPy arrays alike.
+        
+        Args:
+            mastery: Mastery at the last update (0-1)
+            elapsed: Seconds since the last update
+            floor: Value mastery decays toward (usually the topic's p_init)
+        
+        Returns:
+            Mastery at read time (0-1)
+        """
+        retention = np.exp2(-np.maximum(elapsed, 0.0) / self.half_life)
+        # Mastery already below the floor is never raised by forgetting
+        decayed = np.minimum(mastery, floor + (mastery - floor) * retention)
+        return float(decayed) if np.ndim(decayed) == 0 else decayed
@@ -0,0 +1,195 @@
+"""
+Columnar Mastery Store
+Keeps every student's mastery in one students x topics float32 matrix
+"""
+
+import threading
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# float32 keeps about 7 significant digits; reads are rounded to this many
+# decimals so 0.1 comes back as 0.1 rather than 0.10000000149011612
+READ_DECIMALS = 7
+
+class MasteryStore:
+    def __init__(self, topics, chunk_rows=4096, default_mastery=0.1):
+        """
+        Initialize an empty store
+        
+        Args:
+            topics: Dictionary (or list) of topic names, one column each
+            chunk_rows: Rows added per reallocation when the matrix is full
+            default_mastery: Value for topics a new student has no entry for
+        """
+        self.topic_names = list(topics)
+        self.topic_index = {topic: i for i, topic in enumerate(self.topic_names)}
+        self.chunk_rows = chunk_rows
+        self.default_mastery = default_mastery
+        
+        self.matrix = np.full((chunk_rows, len(self.topic_names)), default_mastery, dtype=np.float32)
+        self.student_index = {}
+        # Rows handed out so far and released rows waiting for reuse
+        self.n_rows = 0
+        self._free_rows = []
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.student_index)
+    
+    def __contains__(self, student_name):
+        return student_name in self.student_index
+    
+    def _grow(self):
+        """Reallocate with room for at least one more chunk of rows; caller holds the lock"""
+        capacity = len(self.matrix)
+        extra = max(self.chunk_rows, capacity // 2)
+        grown = np.full((capacity + extra, len(self.topic_names)), self.default_mastery, dtype=np.float32)
+        grown[:capacity] = self.matrix
+        self.matrix = grown
+    
+    def add_student(self, student_name, mastery_levels=None):
+        """
+        Get the row of a student, allocating one if needed
+        
+        Args:
+            student_name: Student identifier
+            mastery_levels: Optional {topic: mastery} for a newly added row
+        
+        Returns:
+            int: Row index of the student
+        """
+        row = self.student_index.get(student_name)
+        if row is not None:
+            return row
+        
+        with self._lock:
+            row = self.student_index.get(student_name)
+            if row is not None:
+                return row
+            
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                row = self.n_rows
+                if row == len(self.matrix):
+                    self._grow()
+                self.n_rows += 1
+            
+            for topic, mastery in (mastery_levels or {}).items():
+                col = self.topic_index.get(topic)
+                if col is not None:
+                    self.matrix[row, col] = mastery
+            self.student_index[student_name] = row
+        return row
+    
+    def row(self, student_name, mastery_levels=None):
+        """
+        Get a dict-like view of one student's mastery
+        
+        Args:
+            student_name: Student identifier
+            mastery_levels: Initial values if the student is new
+        
+        Returns:
+            MasteryRow: Live view backed by the store
+        """
+        return MasteryRow(self, self.add_student(student_name, mastery_levels), student_name)
+    
+    def release(self, row):
+        """
+        Free a student's row so the next new student can reuse it
+        
+        The view switches to a private dict copy, so an engine still holding
+        it keeps working but can no longer write into the reused row.
+        
+        Args:
+            row: MasteryRow returned by row()
+        """
+        with self._lock:
+            if row.index is None:
+                return
+            row.detached = dict(zip(self.topic_names, row._read(self.matrix[row.index])))
+            if self.student_index.get(row.student_name) == row.index:
+                del self.student_index[row.student_name]
+                self.matrix[row.index] = self.default_mastery
+                self._free_rows.append(row.index)
+            row.index = None
+    
+    def get_matrix(self):
+        """
+        Get the students x topics matrix of all rows handed out (a view)
+        
+        Released rows hold default_mastery until a new student reuses them.
+        """
+        return self.matrix[:self.n_rows]
+    
+    def nbytes(self):
+        """Memory held by the matrix, including unused capacity"""
+        return self.matrix.nbytes
+
+
+class MasteryRow(MutableMapping):
+    """
+    Mapping of topic -> mastery over one row of a MasteryStore
+    
+    The row index is resolved against the store on every access, so the
+    view stays valid after the store reallocates its matrix. Once the
+    store releases the row, the view reads and writes a detached dict.
+    """
+    
+    __slots__ = ('store', 'index', 'student_name', 'detached')
+    
+    def __init__(self, store, index, student_name=None):
+        self.store = store
+        self.index = index
+        self.student_name = student_name
+        self.detached = None
+    
+    @staticmethod
+    def _read(values):
+        """Round float32 storage error off one value or row of values"""
+        return np.round(np.asarray(values, dtype=np.float64), READ_DECIMALS).tolist()
+    
+    def __getitem__(self, topic):
+        index = self.index
+        if index is None:
+            return self.detached[topic]
+        value = self.store.matrix[index, self.store.topic_index[topic]]
+        return round(float(value), READ_DECIMALS)
+    
+    def __setitem__(self, topic, mastery):
+        # Under the store lock, so a concurrent _grow cannot copy the old
+        # matrix before this write lands and then swap it out
+        with self.store._lock:
+            if self.index is None:
+                if topic not in self.detached:
+                    raise KeyError(topic)
+                self.detached[topic] = float(mastery)
+                return
+            self.store.matrix[self.index, self.store.topic_index[topic]] = mastery
+    
+    def __delitem__(self, topic):
+        raise TypeError("Topics cannot be removed from a mastery row")
+    
+    def __iter__(self):
+        return iter(self.store.topic_names)
+    
+    def __len__(self):
+        return len(self.store.topic_names)
+    
+    def __repr__(self):
+        return f"MasteryRow({self.copy()!r})"
+    
+    def copy(self):
+        """Get a plain dict snapshot of the row"""
+        index = self.index
+        if index is None:
+            return dict(self.detached)
+        return dict(zip(self.store.topic_names, self._read(self.store.matrix[index])))
+    
+    def as_array(self):
+        """Get the row as a float32 array view (invalidated by store growth)"""
+        if self.index is None:
+            return np.array([self.detached[t] for t in self.store.topic_names], dtype=np.float32)
+        return self.store.matrix[self.index]
@@ -0,0 +1,161 @@
+"""
+Parallel Actor-Learner Q-Learning
+Worker processes simulate students against private Q-table copies that are
+periodically merged into a master table kept in shared memory
+"""
+
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .q_learning import QLearningRecommender
+from .simulator import StudentSimulator, _summarize
+
+def merge_tables(tables, visits, master):
+    """
+    Merge worker Q-tables into the master, weighted by visit counts
+    
+    Cells no worker visited since the last merge keep the master value.
+    
+    Args:
+        tables: workers x T x T array of worker Q-tables
+        visits: workers x T x T array of visits since the last merge
+        master: T x T master table, updated in place
+    """
+    total = visits.sum(axis=0)
+    weighted = (tables * visits).sum(axis=0)
+    np.divide(weighted, total, out=master, where=total > 0)
+
+def _attach(name, shape):
+    """Attach to a shared memory block as a float64 array"""
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+def _actor(worker_id, job, barrier, results):
+    """
+    Worker process: pull master, simulate, publish table and visits
+    
+    A first barrier wait marks every actor as started. Two barrier waits
+    per round then separate "all tables published" from "master merged",
+    so no worker reads a half-written master.
+    """
+    (topics, bkt_params, seed, names, n_topics, workers,
+     rounds, n_batches, n_students, steps) = job
+    shape = (n_topics, n_topics)
+    
+    master_block, master = _attach(names['master'], shape)
+    tables_block, tables = _attach(names['tables'], (workers,) + shape)
+    visits_block, visits = _attach(names['visits'], (workers,) + shape)
+    try:
+        simulator = StudentSimulator(topics, bkt_params=bkt_params, seed=seed)
+        batches = []
+        barrier.wait()
+        for _ in range(rounds):
+            simulator.recommender.q_table[:] = master
+            simulator.visits[:] = 0
+            for _ in range(n_batches):
+                batches.append(simulator.run_batch(n_students, steps))
+            
+            tables[worker_id] = simulator.recommender.q_table
+            visits[worker_id] = simulator.visits
+            barrier.wait()
+            barrier.wait()
+        
+        results.put((worker_id, batches))
+    except BaseException:
+        # Wake the learner instead of leaving it blocked on the barrier
+        barrier.abort()
+        raise
+    finally:
+        master_block.close()
+        tables_block.close()
+        visits_block.close()
+
+def train_parallel(topics, workers=4, rounds=10, n_batches=2, n_students=1000,
+                   steps=20, bkt_params=None, seed=None, recommender=None):
+    """
+    Train a dense Q-table with N actor processes and periodic merges
+    
+    Args:
+        topics: Dictionary of topics with structure
+        workers: Number of actor processes
+        rounds: Number of merge rounds
+        n_batches: Simulated batches per actor between merges
+        n_students: Simulated students per batch
+        steps: Topics studied per episode
+        bkt_params: Optional per-topic BKT parameter table
+        seed: Root seed; each actor gets its own SeedSequence child
+        recommender: Optional dense QLearningRecommender to start from
+    
+    Returns:
+        tuple: (statistics dict, trained QLearningRecommender); 'seconds'
+               and 'episodes_per_second' cover the training rounds only,
+               'startup_seconds' the process and shared memory setup
+    """
+    recommender = recommender or QLearningRecommender(topics, dense=True)
+    n_topics = len(recommender.topics)
+    shape = (n_topics, n_topics)
+    cell_bytes = np.dtype(np.float64).itemsize * n_topics * n_topics
+    
+    blocks = {
+        'master': shared_memory.SharedMemory(create=True, size=cell_bytes),
+        'tables': shared_memory.SharedMemory(create=True, size=cell_bytes * workers),
+        'visits': shared_memory.SharedMemory(create=True, size=cell_bytes * workers)
+    }
+    names = {key: block.name for key, block in blocks.items()}
+    master = np.ndarray(shape, dtype=np.float64, buffer=blocks['master'].buf)
+    tables = np.ndarray((workers,) + shape, dtype=np.float64, buffer=blocks['tables'].buf)
+    visits = np.ndarray((workers,) + shape, dtype=np.float64, buffer=blocks['visits'].buf)
+    master[:] = recommender.q_table
+    
+    ctx = mp.get_context()
+    barrier = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    processes = [
+        ctx.Process(target=_actor, args=(i, (
+            topics, bkt_params, seeds[i], names, n_topics, workers,
+            rounds, n_batches, n_students, steps
+        ), barrier, results))
+        for i in range(workers)
+    ]
+    
+    start = time.perf_counter()
+    try:
+        for process in processes:
+            process.start()
+        # Every actor is attached and has built its simulator
+        barrier.wait()
+        training_start = time.perf_counter()
+        for _ in range(rounds):
+            barrier.wait()
+            merge_tables(tables, visits, master)
+            barrier.wait()
+        elapsed = time.perf_counter() - training_start
+        
+        batches = []
+        for _ in range(workers):
+            batches.extend(results.get()[1])
+        for process in processes:
+            process.join()
+        
+        recommender.q_table = np.array(master)
+    finally:
+        barrier.abort()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+    
+    # _summarize also covers rounds=0, where there are no batches to average
+    stats = {
+        'workers': workers,
+        'rounds': rounds,
+        'startup_seconds': training_start - start,
+        **_summarize(batches, elapsed)
+    }
+    return stats, recommender
@@ -0,0 +1,179 @@
+"""
+Model-Based Learning Path Planner
+Dynamic programming over the topic DAG with discretized mastery
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .bkt import BayesianKnowledgeTracing
+from .bkt_fit import build_topic_models
+from .q_learning import QLearningRecommender
+
+class LearningPathPlanner:
+    """Deterministic N-step learning paths maximizing discounted get_reward"""
+    
+    def __init__(self, topics, q_learner=None, bkt_params=None, n_buckets=20,
+                 gamma=None, practice=3, branching=8, cache_size=4096):
+        """
+        Initialize the planner
+        
+        Args:
+            topics: Dictionary of topics with structure
+            q_learner: QLearningRecommender providing get_reward and the
+                       prerequisite index (created if None)
+            bkt_params: Optional per-topic BKT parameter table
+            n_buckets: Number of equal-width mastery buckets
+            gamma: Discount factor (defaults to the Q-learner's)
+            practice: Responses a path step is expected to take
+            branching: Topics expanded per state, best immediate reward first
+            cache_size: Maximum number of memoized paths
+        """
+        self.q_learner = q_learner if q_learner is not None else QLearningRecommender(topics, dense=True)
+        self.prereq_index = self.q_learner.prereq_index
+        self.topics = list(topics.keys())
+        self.topic_info = topics
+        self.n_buckets = n_buckets
+        self.gamma = self.q_learner.gamma if gamma is None else gamma
+        self.practice = practice
+        self.branching = branching
+        self.cache_size = cache_size
+        
+        default_bkt = BayesianKnowledgeTracing()
+        topic_bkt = build_topic_models(bkt_params or {})
+        self.p_learn = np.array([topic_bkt.get(t, default_bkt).p_learn for t in self.topics])
+        
+        # Bucket b covers [b, b + 1) / n_buckets and is represented by its center
+        self.centers = (np.arange(n_buckets) + 0.5) / n_buckets
+        
+        # Everything a cached path depends on besides the student's buckets
+        self.curriculum_key = hash((
+            tuple((t, topics[t]['difficulty'], tuple(topics[t].get('prereqs', [])))
+                  for t in self.topics),
+            tuple(self.p_learn.tolist()), n_buckets, self.gamma, practice, branching
+        ))
+        
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def bucketize(self, mastery_levels):
+        """
+        Discretize mastery levels into a bucket vector
+        
+        Args:
+            mastery_levels: Dictionary of mastery levels for all topics
+        
+        Returns:
+            tuple: One bucket index per topic in curriculum order
+        """
+        mastery = np.array([mastery_levels.get(t, 0.0) for t in self.topics])
+        buckets = np.clip((mastery * self.n_buckets).astype(np.int64), 0, self.n_buckets - 1)
+        return tuple(buckets.tolist())
+    
+    def plan(self, mastery_levels, start_topic, steps=5):
+        """
+        Get the best path of distinct topics starting at start_topic
+        
+        The search only expands the top `branching` topics per state, so the
+        path is optimal within that pruned search, not over every ordering.
+        
+        Args:
+            mastery_levels: Dictionary of mastery levels for all topics
+            start_topic: Topic studied first
+            steps: Maximum path length, including start_topic
+        
+        Returns:
+            list: Topic names in study order; shorter than steps when no
+                  further topic has a positive discounted value
+        """
+        key = (self.curriculum_key, start_topic, steps, self.bucketize(mastery_levels))
+        with self._lock:
+            path = self._cache.get(key)
+            if path is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(path)
+            self.misses += 1
+        
+        path = self._solve(start_topic, steps, key[3])
+        with self._lock:
+            self._cache[key] = path
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(path)
+    
+    def _solve(self, start_topic, steps, buckets):
+        """
+        Run the dynamic program for one (start, steps, buckets) state
+        
+        Each topic is studied at most once, so a topic's mastery is either
+        its starting bucket or the bucket after `practice` expected BKT
+        updates.
+        The whole state therefore reduces to the bitmask of visited topics,
+        and the reward for a topic does not depend on when it is chosen;
+        only its availability does.
+        """
+        start = self.prereq_index.topic_position[start_topic]
+        before = self.centers[np.array(buckets)]
+        
+        # E[update] = m + p_learn * (1 - m) since the Bayes step is a
+        # martingale, so k expected updates leave (1 - m) * (1 - p_learn)^k
+        after = 1 - (1 - before) * (1 - self.p_learn) ** self.practice
+        after = self.centers[np.minimum((after * self.n_buckets).astype(np.int64), self.n_buckets - 1)]
+        
+        threshold = self.prereq_index.threshold
+        mastered_before = sum(1 << i for i in np.flatnonzero(before > threshold).tolist())
+        mastered_after = sum(1 << i for i in np.flatnonzero(after > threshold).tolist())
+        
+        difficulty = self.q_learner.topic_difficulty
+        rewards = [self.q_learner.get_reward(float(m), difficulty[i], True)
+                   for i, m in enumerate(before)]
+        # Expansion order: best immediate reward first, ties in curriculum order
+        order = sorted(range(len(self.topics)), key=lambda i: -rewards[i])
+        prereq_masks = self.prereq_index.prereq_masks
+        
+        memo = {}
+        
+        def best(visited, remaining):
+            """(discounted value, next topic index or None to stop) from a visited bitmask"""
+            if remaining == 0:
+                return 0.0, None
+            cached = memo.get(visited)
+            if cached is not None:
+                return cached
+            
+            mastered = (mastered_before & ~visited) | (mastered_after & visited)
+            # Stopping is worth 0, so only steps that pay off are taken
+            result = (0.0, None)
+            expanded = 0
+            for i in order:
+                if expanded == self.branching:
+                    break
+                bit = 1 << i
+                if visited & bit or prereq_masks[i] & ~mastered:
+                    continue
+                expanded += 1
+                value = rewards[i] + self.gamma * best(visited | bit, remaining - 1)[0]
+                if value > result[0]:
+                    result = (value, i)
+            memo[visited] = result
+            return result
+        
+        path = [start_topic]
+        visited = 1 << start
+        for remaining in range(steps - 1, 0, -1):
+            action = best(visited, remaining)[1]
+            if action is None:
+                break
+            path.append(self.topics[action])
+            visited |= 1 << action
+        return tuple(path)
+    
+    def get_stats(self):
+        """Get cache statistics"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'cached_paths': len(self._cache)}
@@ -0,0 +1,100 @@
+"""
+Prerequisite Bitmask Index
+Compiles the topic graph into integer bitmasks for fast availability checks
+"""
+
+import numpy as np
+
+class PrerequisiteIndex:
+    def __init__(self, topics, threshold=0.6):
+        """
+        Compile prerequisite lists into bitmasks
+        
+        Args:
+            topics: Dictionary of topics with prerequisites
+            threshold: Mastery above which a topic counts as mastered
+        """
+        self.topics = list(topics.keys())
+        self.threshold = threshold
+        self.topic_position = {topic: i for i, topic in enumerate(self.topics)}
+        self.topic_bit = {topic: 1 << i for i, topic in enumerate(self.topics)}
+        
+        # prereq_masks[i] has a bit set for each prerequisite of topic i
+        self.prereq_masks = []
+        for topic in self.topics:
+            mask = 0
+            for prereq in topics[topic].get('prereqs', []):
+                mask |= self.topic_bit.get(prereq, 0)
+            self.prereq_masks.append(mask)
+        
+        # Availability per mastered mask; students share few distinct masks
+        self._available_cache = {}
+        self.cache_size = 4096
+    
+    def mastered_mask(self, mastery_levels):
+        """
+        Build the "mastered above threshold" bitmask from scratch
+        
+        Args:
+            mastery_levels: Dictionary of mastery levels for all topics
+        
+        Returns:
+            int: Bitmask with one bit per mastered topic
+        """
+        mask = 0
+        for topic, bit in self.topic_bit.items():
+            if mastery_levels.get(topic, 0) > self.threshold:
+                mask |= bit
+        return mask
+    
+    def update_mastered(self, mastered, topic, mastery):
+        """
+        Incrementally update a mastered bitmask after one topic changed
+        
+        Returns:
+            int: New mastered bitmask
+        """
+        bit = self.topic_bit.get(topic, 0)
+        return mastered | bit if mastery > self.threshold else mastered & ~bit
+    
+    def is_available(self, topic, mastered):
+        """Check if every prerequisite of a topic is in the mastered bitmask"""
+        return self.prereq_masks[self.topic_position[topic]] & ~mastered == 0
+    
+    def _available(self, mastered):
+        """Cached (bitmask, boolean vector) of available topics"""
+        cached = self._available_cache.get(mastered)
+        if cached is None:
+            if len(self._available_cache) >= self.cache_size:
+                self._available_cache.clear()
+            vector = np.array([prereqs & ~mastered == 0 for prereqs in self.prereq_masks])
+            mask = 0
+            for i in np.flatnonzero(vector):
+                mask |= 1 << int(i)
+            cached = self._available_cache[mastered] = (mask, vector)
+        return cached
+    
+    def available_mask(self, mastered):
+        """Get the bitmask of topics whose prerequisites are all mastered"""
+        return self._available(mastered)[0]
+    
+    def available_vector(self, mastered):
+        """Get a boolean vector over self.topics of available topics"""
+        return self._available(mastered)[1]
+    
+    def prereq_matrix(self):
+        """
+        Dense boolean form of the index for batch computations
+        
+        Returns:
+            np.ndarray: T x T, [i, j] is True when topic j is a prerequisite of i
+        """
+        n = len(self.topics)
+        return np.array([
+            [mask >> j & 1 == 1 for j in range(n)] for mask in self.prereq_masks
+        ], dtype=bool).reshape(n, n)
+    
+    def available_topics(self, mastered):
+        """Get the names of available topics in curriculum order"""
+        vector = self.available_vector(mastered)
+        return [topic for topic, ok in zip(self.topics, vector) if ok]
@@ -5,9 +5,25 @@ Uses Reinforcement Learning to optimize topic sequencing
 
 import random
 import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: checkpoints are not locked across processes
+    fcntl = None
+
+import numpy as np
+
+from .prereq_index import PrerequisiteIndex
+from .qtable_format import open_matrix, read_header, write_model, write_rows
+
+# Prerequisites count as met once their mastery exceeds this value
+PREREQ_THRESHOLD = 0.6
 
 class QLearningRecommender:
-    def __init__(self, topics, alpha=0.1, gamma=0.9, epsilon=0.2):
+    def __init__(self, topics, alpha=0.1, gamma=0.9, epsilon=0.2, dense=False):
         """
         Initialize Q-Learning recommender
         
@@ -16,17 +32,33 @@ class QLearningRecommender:
             alpha: Learning rate (0-1)
             gamma: Discount factor (0-1)
             epsilon: Exploration rate (0-1)
+            dense: Store the Q-table as a T x T NumPy matrix instead of dicts
         """
         self.topics = list(topics.keys())
         self.topic_info = topics
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
+        self.dense = dense
+        self.topic_index = {topic: i for i, topic in enumerate(self.topics)}
+        
+        # Prerequisites compiled to bitmasks for availability checks
+        self.prereq_index = PrerequisiteIndex(topics, PREREQ_THRESHOLD)
+        self.topic_difficulty = np.array([topics[t]['difficulty'] for t in self.topics], dtype=np.float64)
         
         # Initialize Q-table: Q[state][action] = value
-        self.q_table = {}
-        for topic in self.topics:
-            self.q_table[topic] = {t: 0.0 for t in self.topics}
+        if dense:
+            self.q_table = np.zeros((len(self.topics), len(self.topics)))
+        else:
+            self.q_table = {}
+            for topic in self.topics:
+                self.q_table[topic] = {t: 0.0 for t in self.topics}
+        
+        # State rows changed since the last binary save, for checkpoints,
+        # and their values before the first change
+        self._dirty_rows = set()
+        self._row_baseline = {}
+        self._checkpoint_path = None
     
     def get_reward(self, mastery_level, difficulty, prereqs_met):
         """
@@ -57,22 +89,46 @@ class QLearningRecommender:
         else:
             return -5  # Poor match (too easy or too hard)
     
-    def recommend_next(self, current_topic, mastery_levels):
+    def get_reward_batch(self, mastery_level, difficulty, prereqs_met):
+        """
+        Vectorized version of get_reward
+        
+        Args:
+            mastery_level: Array of current mastery (0-1)
+            difficulty: Array of topic difficulties (1-5)
+            prereqs_met: Boolean array of prerequisite checks
+            
+        Returns:
+            np.ndarray: Reward values
+        """
+        gap = np.abs(np.asarray(difficulty) / 5.0 - np.asarray(mastery_level))
+        reward = np.select([gap < 0.2, gap < 0.4, gap < 0.6], [10.0, 5.0, 0.0], -5.0)
+        return np.where(prereqs_met, reward, -10.0)
+    
+    def recommend_next(self, current_topic, mastery_levels, mastered_mask=None):
         """
         Recommend next topic using epsilon-greedy strategy
         
         Args:
             current_topic: Current topic being studied
             mastery_levels: Dictionary of mastery levels for all topics
+            mastered_mask: Optional prerequisite bitmask from
+                           self.prereq_index; skips rescanning mastery_levels
             
         Returns:
             str: Recommended next topic
         """
+        if self.dense:
+            return self._recommend_next_dense(current_topic, mastery_levels, mastered_mask)
+        
         # Filter available topics (prerequisites met)
-        available = [
-            t for t in self.topics 
-            if self._prereqs_met(t, mastery_levels)
-        ]
+        if mastered_mask is not None:
+            available = self.prereq_index.available_topics(mastered_mask)
+        else:
+            available = [
+                t for t in self.topics 
+                if self._prereqs_met(t, mastery_levels)
+            ]
         
         if not available:
             return self.topics[0]  # Default to first topic
@@ -101,6 +157,20 @@ class QLearningRecommender:
             reward: Reward received
             next_state: Resulting topic
         """
+        if self.dense:
+            s = self.topic_index[state]
+            a = self.topic_index[action]
+            if s not in self._dirty_rows:
+                self._mark_dirty(s)
+            max_next_q = self.q_table[self.topic_index[next_state]].max()
+            self.q_table[s, a] += self.alpha * (
+                reward + self.gamma * max_next_q - self.q_table[s, a]
+            )
+            return
+        
+        s = self.topic_index[state]
+        if s not in self._dirty_rows:
+            self._mark_dirty(s)
         current_q = self.q_table[state][action]
         max_next_q = max(self.q_table[next_state].values())
         
@@ -110,17 +180,269 @@ class QLearningRecommender:
         
         self.q_table[state][action] = new_q
     
+    def _mark_dirty(self, row):
+        """Record a row as changed, keeping its value before the change"""
+        self._row_baseline[row] = self._row_values(row).copy()
+        self._dirty_rows.add(row)
+    
+    def _row_values(self, row):
+        """Q-values of one state row as an array, whatever the storage mode"""
+        if self.dense:
+            return self.q_table[row]
+        actions = self.q_table[self.topics[row]]
+        return np.array([actions.get(action, 0.0) for action in self.topics])
+    
+    def _set_row(self, row, values):
+        """Replace one state row in either storage mode"""
+        if self.dense:
+            self.q_table[row] = values
+        else:
+            self.q_table[self.topics[row]] = dict(zip(self.topics, values.tolist()))
+    
+    def get_q_value(self, state, action):
+        """Get Q(state, action) in either table mode"""
+        if self.dense:
+            return float(self.q_table[self.topic_index[state], self.topic_index[action]])
+        return self.q_table[state].get(action, 0)
+    
+    def available_mask(self, mastery_levels):
+        """
+        Boolean availability vector over self.topics
+        
+        Args:
+            mastery_levels: Dictionary of mastery levels for all topics
+            
+        Returns:
+            np.ndarray: True where every prerequisite is mastered
+        """
+        mastered = self.prereq_index.mastered_mask(mastery_levels)
+        return self.prereq_index.available_vector(mastered)
+    
+    def _recommend_next_dense(self, current_topic, mastery_levels, mastered_mask=None):
+        """recommend_next as one masked argmax over the dense Q-table"""
+        if mastered_mask is not None:
+            available = self.prereq_index.available_vector(mastered_mask)
+        else:
+            available = self.available_mask(mastery_levels)
+        if not available.any():
+            return self.topics[0]  # Default to first topic
+        
+        # Epsilon-greedy: explore vs exploit
+        if random.random() < self.epsilon:
+            return self.topics[random.choice(np.flatnonzero(available))]
+        
+        q_values = np.where(available, self.q_table[self.topic_index[current_topic]], -np.inf)
+        return self.topics[int(np.argmax(q_values))]
+    
     def _prereqs_met(self, topic, mastery_levels):
         """Check if prerequisites are sufficiently mastered"""
         prereqs = self.topic_info[topic].get('prereqs', [])
-        return all(mastery_levels.get(p, 0) > 0.6 for p in prereqs)
+        return all(mastery_levels.get(p, 0) > PREREQ_THRESHOLD for p in prereqs)
+    
+    def to_dict(self):
+        """Get the Q-table as nested dicts, whatever the storage mode"""
+        if not self.dense:
+            return self.q_table
+        return {
+            state: dict(zip(self.topics, self.q_table[i].tolist()))
+            for i, state in enumerate(self.topics)
+        }
     
     def save_model(self, filepath):
         """Save Q-table to JSON file"""
         with open(filepath, 'w') as f:
-            json.dump(self.q_table, f, indent=2)
+            json.dump(self.to_dict(), f, indent=2)
     
     def load_model(self, filepath):
         """Load Q-table from JSON file"""
         with open(filepath, 'r') as f:
-            self.q_table = json.load(f)
+            q_table = json.load(f)
+        self._assign_table(q_table)
+    
+    def _assign_table(self, q_table):
+        """Replace the Q-table with nested-dict values in the current mode"""
+        self._dirty_rows = set()
+        self._row_baseline = {}
+        self._checkpoint_path = None
+        
+        if not self.dense:
+            self.q_table = q_table
+            return
+        
+        # Topics unknown to this curriculum are skipped
+        loaded = np.zeros((len(self.topics), len(self.topics)))
+        for state, actions in q_table.items():
+            if state in self.topic_index:
+                for action, value in actions.items():
+                    if action in self.topic_index:
+                        loaded[self.topic_index[state], self.topic_index[action]] = value
+        self.q_table = loaded
+    
+    def _as_matrix(self):
+        """Get the Q-table as a T x T array, whatever the storage mode"""
+        if self.dense:
+            return self.q_table
+        return np.array([
+            [self.q_table[state].get(action, 0.0) for action in self.topics]
+            for state in self.topics
+        ])
+    
+    def save_binary(self, filepath):
+        """
+        Save the Q-table in the binary format of core.qtable_format
+        
+        Args:
+            filepath: Destination model file
+        """
+        self._write_binary(filepath)
+    
+    def _write_binary(self, filepath):
+        """Write the full binary model and mark every row clean"""
+        write_model(
+            filepath, self.topics, self._as_matrix(),
+            alpha=self.alpha, gamma=self.gamma, epsilon=self.epsilon
+        )
+        self._dirty_rows = set()
+        self._row_baseline = {}
+        self._checkpoint_path = filepath
+    
+    def load_binary(self, filepath, mmap=True):
+        """
+        Load a binary model, memory-mapping the matrix when possible
+        
+        Args:
+            filepath: Model file written by save_binary
+            mmap: Keep the dense table as a copy-on-write numpy.memmap
+                  instead of reading it into memory
+        """
+        header, matrix = open_matrix(filepath)
+        self.alpha = header.get('alpha', self.alpha)
+        self.gamma = header.get('gamma', self.gamma)
+        self.epsilon = header.get('epsilon', self.epsilon)
+        
+        if not self.dense or header['topics'] != self.topics:
+            topics = header['topics']
+            self._assign_table({
+                state: dict(zip(topics, matrix[i].tolist()))
+                for i, state in enumerate(topics)
+            })
+            return
+        
+        self.q_table = matrix if mmap else np.array(matrix, dtype=np.float64)
+        self._dirty_rows = set()
+        self._row_baseline = {}
+        self._checkpoint_path = filepath
+    
+    def has_unsaved_changes(self):
+        """Whether any row changed since the last binary save or load"""
+        return bool(self._dirty_rows)
+    
+    def save_checkpoint(self, filepath):
+        """
+        Write only the rows updated since the last binary save or load
+        
+        Several processes may checkpoint into the same file, e.g. every
+        worker of a multi-worker server at exit. Under an exclusive file
+        lock each changed row is written as the file's current row plus this
+        table's change since its last sync, so concurrent learning adds up
+        instead of the last writer winning. The merged rows are also taken
+        into this table.
+        
+        Falls back to a full save_binary when the file does not exist yet or
+        holds a different curriculum.
+        
+        Args:
+            filepath: Model file to update
+            
+        Returns:
+            int: Number of rows written
+        """
+        with _file_lock(filepath + '.lock'):
+            if (not os.path.exists(filepath)
+                    or read_header(filepath)[0]['topics'] != self.topics):
+                self._write_binary(filepath)
+                return len(self.topics)
+            
+            rows, self._dirty_rows = self._dirty_rows, set()
+            baseline, self._row_baseline = self._row_baseline, {}
+            if rows:
+                _, on_disk = open_matrix(filepath, mode='r')
+                merged = np.array(on_disk, dtype=np.float64)
+                del on_disk
+                for row in rows:
+                    merged[row] += self._row_values(row) - baseline[row]
+                    self._set_row(row, merged[row])
+                write_rows(filepath, merged, rows)
+            self._checkpoint_path = filepath
+            return len(rows)
+
+
+@contextmanager
+def _file_lock(lock_path):
+    """Hold an exclusive lock on lock_path across processes (no-op without fcntl)"""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class SharedQLearningRecommender(QLearningRecommender):
+    """
+    Q-Learning policy shared by every student engine in the process
+    
+    Each state row has its own lock, so concurrent updates only contend
+    when they target the same state. Reads need no lock because a row
+    value is replaced by a single assignment.
+    """
+    
+    def __init__(self, topics, alpha=0.1, gamma=0.9, epsilon=0.2, dense=False):
+        super().__init__(topics, alpha, gamma, epsilon, dense)
+        self._row_locks = {topic: threading.Lock() for topic in self.topics}
+        self._save_lock = threading.Lock()
+    
+    @contextmanager
+    def _all_rows_locked(self):
+        """Hold every row lock, e.g. while the whole table is read or replaced"""
+        with self._save_lock:
+            for lock in self._row_locks.values():
+                lock.acquire()
+            try:
+                yield
+            finally:
+                for lock in self._row_locks.values():
+                    lock.release()
+    
+    def update_q_value(self, state, action, reward, next_state):
+        """Thread-safe version of QLearningRecommender.update_q_value"""
+        with self._row_locks[state]:
+            super().update_q_value(state, action, reward, next_state)
+    
+    def save_model(self, filepath):
+        """Save Q-table to JSON file while holding every row lock"""
+        with self._all_rows_locked():
+            super().save_model(filepath)
+    
+    def load_model(self, filepath):
+        """Load Q-table from JSON file while holding every row lock"""
+        with self._all_rows_locked():
+            super().load_model(filepath)
+    
+    def save_binary(self, filepath):
+        """Save a binary model while holding every row lock"""
+        with self._all_rows_locked():
+            super().save_binary(filepath)
+    
+    def load_binary(self, filepath, mmap=True):
+        """Load a binary model while holding every row lock"""
+        with self._all_rows_locked():
+            super().load_binary(filepath, mmap)
+    
+    def save_checkpoint(self, filepath):
+        """Write changed rows while holding every row lock"""
+        with self._all_rows_locked():
+            return super().save_checkpoint(filepath)
@@ -0,0 +1,202 @@
+"""
+Offline Batch Q-Learning Trainer
+Learns the topic-sequencing Q-table from logged learning sessions
+"""
+
+import time
+
+import numpy as np
+
+from .bkt import BayesianKnowledgeTracing
+from .bkt_fit import build_topic_models
+from .q_learning import QLearningRecommender
+
+def build_transitions(events, topics, bkt_params=None):
+    """
+    Derive (state, action, reward, next_state) transitions from responses
+    
+    Each student's consecutive answers form one transition: the previous
+    topic is the state and the answered topic is the action. The reward is
+    the one get_reward would have given at that moment, using mastery
+    traced through BKT and the student's prerequisite bitmask.
+    
+    Args:
+        events: Iterable of response events in chronological order
+        topics: Dictionary of topics with structure
+        bkt_params: Optional per-topic BKT parameter table
+    
+    Returns:
+        dict: Arrays 'states', 'actions', 'rewards' and 'next_states'
+    """
+    recommender = QLearningRecommender(topics)
+    prereq_index = recommender.prereq_index
+    default_bkt = BayesianKnowledgeTracing()
+    topic_bkt = build_topic_models(bkt_params or {})
+    models = [topic_bkt.get(topic, default_bkt) for topic in recommender.topics]
+    topic_ids = recommender.topic_index
+    
+    # Per student: [previous topic id, mastered bitmask, {topic id: mastery}]
+    students = {}
+    states, actions, mastery_before, prereqs_met = [], [], [], []
+    
+    for event in events:
+        action = topic_ids.get(event['topic'])
+        if action is None:
+            continue
+        
+        student = students.get(event['student_name'])
+        if student is None:
+            student = students[event['student_name']] = [None, 0, {}]
+        previous, mastered, mastery = student
+        
+        current = mastery.get(action, models[action].p_init)
+        if previous is not None:
+            states.append(previous)
+            actions.append(action)
+            mastery_before.append(current)
+            prereqs_met.append(prereq_index.prereq_masks[action] & ~mastered == 0)
+        
+        updated = models[action].update_mastery(current, event['is_correct'])
+        mastery[action] = updated
+        student[0] = action
+        student[1] = prereq_index.update_mastered(mastered, event['topic'], updated)
+    
+    actions = np.array(actions, dtype=np.int32)
+    rewards = recommender.get_reward_batch(
+        np.array(mastery_before),
+        recommender.topic_difficulty[actions],
+        np.array(prereqs_met, dtype=bool)
+    )
+    return {
+        'states': np.array(states, dtype=np.int32),
+        'actions': actions,
+        'rewards': rewards.astype(np.float32),
+        'next_states': actions.copy()
+    }
+
+class OfflineQTrainer:
+    """Vectorized Q-Learning over a replay buffer of logged transitions"""
+    
+    def __init__(self, recommender, batch_size=65536, seed=None):
+        """
+        Initialize the trainer
+        
+        Args:
+            recommender: Dense QLearningRecommender whose table is trained
+            batch_size: Transitions per vectorized update
+            seed: Seed for minibatch sampling
+        """
+        if not recommender.dense:
+            raise ValueError("OfflineQTrainer needs a dense QLearningRecommender")
+        self.recommender = recommender
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+    
+    def train_batch(self, states, actions, rewards, next_states):
+        """
+        Apply one batched Q-Learning update
+        
+        Every transition in the batch sees the same table. TD errors that
+        target the same (state, action) are averaged, so a popular pair
+        moves by alpha per batch instead of alpha times its count.
+        
+        Returns:
+            float: Mean absolute TD error of the batch
+        """
+        q = self.recommender.q_table
+        n_topics = q.shape[1]
+        gamma = self.recommender.gamma
+        
+        targets = rewards + gamma * q[next_states].max(axis=1)
+        td_error = targets - q[states, actions]
+        
+        cells = states.astype(np.int64) * n_topics + actions
+        counts = np.bincount(cells, minlength=q.size)
+        sums = np.bincount(cells, weights=td_error, minlength=q.size)
+        touched = counts > 0
+        
+        flat = q.reshape(-1)
+        flat[touched] += self.recommender.alpha * sums[touched] / counts[touched]
+        return float(np.abs(td_error).mean())
+    
+    def train(self, transitions, epochs=20):
+        """
+        Run several epochs of experience replay over the transitions
+        
+        Args:
+            transitions: Arrays as returned by build_transitions
+            epochs: Number of passes over the replay buffer
+        
+        Returns:
+            dict: Training statistics including transitions per second
+        """
+        states = transitions['states']
+        actions = transitions['actions']
+        rewards = transitions['rewards']
+        next_states = transitions['next_states']
+        n = len(states)
+        
+        history = []
+        start = time.perf_counter()
+        for _ in range(epochs):
+            if n == 0:
+                break
+            # Shuffled minibatches break the temporal correlation of the log
+            order = self.rng.permutation(n)
+            errors = []
+            for i in range(0, n, self.batch_size):
+                batch = order[i:i + self.batch_size]
+                errors.append(self.train_batch(
+                    states[batch], actions[batch], rewards[batch], next_states[batch]
+                ))
+            history.append(float(np.mean(errors)))
+        elapsed = time.perf_counter() - start
+        
+        return {
+            'transitions': n,
+            'epochs': epochs,
+            'seconds': elapsed,
+            'transitions_per_second': n * epochs / elapsed if elapsed > 0 else 0.0,
+            'td_error': history
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import os
+    import sys
+    
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.bkt_fit import PARAMS_PATH, load_parameter_table
+    from utils.mastery_state import DB_PATH
+    from utils.response_log import iter_responses
+    
+    parser = argparse.ArgumentParser(description='Train the Q-table offline from the response log')
+    parser.add_argument('--source', default=DB_PATH, help='Response log (.jsonl, .csv or SQLite)')
+    parser.add_argument('--topics', default=os.path.join('data', 'topics_graph.json'))
+    parser.add_argument('--params', default=PARAMS_PATH, help='Per-topic BKT parameter table')
+    parser.add_argument('--output', default=os.path.join('data', 'q_model.bin'))
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=65536)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    
+    with open(args.topics, 'r') as f:
+        topics = json.load(f)
+    
+    transitions = build_transitions(
+        iter_responses(args.source), topics, load_parameter_table(args.params)
+    )
+    print(f"📚 Built {len(transitions['states'])} transitions")
+    
+    recommender = QLearningRecommender(topics, dense=True)
+    if os.path.exists(args.output):
+        recommender.load_binary(args.output, mmap=False)
+    
+    trainer = OfflineQTrainer(recommender, args.batch_size, args.seed)
+    stats = trainer.train(transitions, args.epochs)
+    recommender.save_binary(args.output)
+    
+    print(f"🤖 {stats['epochs']} epochs, {stats['transitions_per_second']:,.0f} transitions/s")
+    print(f"✓ Saved {args.output}")
@@ -0,0 +1,107 @@
+"""
+Binary Q-Table Model Format
+A small JSON header followed by a float32 matrix that numpy.memmap can open
+
+Layout:
+    4 bytes   magic b'ILQT'
+    4 bytes   format version (uint32, little endian)
+    4 bytes   header length in bytes (uint32, little endian)
+    N bytes   UTF-8 JSON header (topics and hyperparameters)
+    padding   up to a 64-byte boundary
+    T*T*4     float32 Q-matrix, row-major, row i = state topics[i]
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'ILQT'
+VERSION = 1
+ALIGNMENT = 64
+DTYPE = np.dtype('<f4')
+
+def _data_offset(header_bytes):
+    """Byte offset of the matrix for a given encoded header"""
+    offset = 12 + len(header_bytes)
+    return offset + (-offset % ALIGNMENT)
+
+def write_model(filepath, topics, q_matrix, **hyperparams):
+    """
+    Write a complete model file atomically
+    
+    Args:
+        filepath: Destination path
+        topics: Topic names in matrix order
+        q_matrix: T x T array of Q-values
+        **hyperparams: Values stored in the header (alpha, gamma, epsilon)
+    """
+    header = dict(hyperparams, topics=list(topics))
+    header_bytes = json.dumps(header).encode('utf-8')
+    offset = _data_offset(header_bytes)
+    
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<II', VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (offset - f.tell()))
+        f.write(np.ascontiguousarray(q_matrix, dtype=DTYPE).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
+def read_header(filepath):
+    """
+    Read the header of a model file
+    
+    Returns:
+        tuple: (header dict, byte offset of the matrix)
+    """
+    with open(filepath, 'rb') as f:
+        magic = f.read(4)
+        if magic != MAGIC:
+            raise ValueError(f"Not an IntelliLearn Q-table file: {filepath}")
+        version, header_len = struct.unpack('<II', f.read(8))
+        if version != VERSION:
+            raise ValueError(f"Unsupported Q-table format version {version}")
+        header_bytes = f.read(header_len)
+    return json.loads(header_bytes.decode('utf-8')), _data_offset(header_bytes)
+
+def open_matrix(filepath, mode='c'):
+    """
+    Map the Q-matrix of a model file without reading it
+    
+    Args:
+        filepath: Model file
+        mode: numpy.memmap mode; the default 'c' gives a writable
+              copy-on-write view that never touches the file
+    
+    Returns:
+        tuple: (header dict, T x T numpy.memmap)
+    """
+    header, offset = read_header(filepath)
+    n = len(header['topics'])
+    matrix = np.memmap(filepath, dtype=DTYPE, mode=mode, offset=offset, shape=(n, n))
+    return header, matrix
+
+def write_rows(filepath, q_matrix, rows):
+    """
+    Overwrite selected rows of an existing model file in place
+    
+    Args:
+        filepath: Model file whose layout matches q_matrix
+        q_matrix: T x T array holding the current values
+        rows: Iterable of row indices to write
+    """
+    header, offset = read_header(filepath)
+    n = len(header['topics'])
+    row_bytes = n * DTYPE.itemsize
+    
+    with open(filepath, 'r+b') as f:
+        for row in sorted(rows):
+            f.seek(offset + row * row_bytes)
+            f.write(np.ascontiguousarray(q_matrix[row], dtype=DTYPE).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,72 @@
+"""
+Recommendation Cache
+Size-bounded LRU of per-student recommendations, invalidated by version
+"""
+
+import threading
+from collections import OrderedDict
+
+class RecommendationCache:
+    def __init__(self, max_entries=10000):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries: Maximum number of students kept; the least
+                         recently used entry is evicted beyond this
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, student, version, current_topic=None):
+        """
+        Look up a recommendation
+        
+        Args:
+            student: Student key
+            version: The student's current mastery/response version
+            current_topic: Topic the recommendation was made from, or None
+                           to accept the entry at this version from any topic
+        
+        Returns:
+            dict or None: The cached recommendation if still valid
+        """
+        with self._lock:
+            entry = self._entries.get(student)
+            if (entry is None or entry[0] != version
+                    or current_topic is not None and entry[1] != current_topic):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(student)
+            self.hits += 1
+            return entry[2]
+    
+    def put(self, student, version, current_topic, recommendation):
+        """Store the recommendation for a student at a version"""
+        with self._lock:
+            self._entries[student] = (version, current_topic, recommendation)
+            self._entries.move_to_end(student)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, student):
+        """Drop a student's entry"""
+        with self._lock:
+            self._entries.pop(student, None)
+    
+    def get_stats(self):
+        """Get hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
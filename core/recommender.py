@@ -3,27 +3,144 @@ Main Recommendation Engine
 Combines BKT, Q-Learning, and Clustering
 """
 
+import time
+
+import numpy as np
+
 from .bkt import BayesianKnowledgeTracing
+from .bkt_fit import build_topic_models
 from .q_learning import QLearningRecommender
-from .clustering import LearningStyleClassifier
+from .clustering import FeatureAccumulator, LearningStyleClassifier
+
+# With forgetting, mastery changes as time passes without a version bump;
+# cached recommendations are then only reused within windows of this length
+FORGETTING_CACHE_SECONDS = 60
 
 class IntelliLearnEngine:
     """Main engine combining all ML techniques"""
     
-    def __init__(self, topics):
+    def __init__(self, topics, bkt_params=None, forgetting=None,
+                 mastery_store=None, student_name=None, q_learner=None,
+                 recommendation_cache=None, style_classifier=None):
         """
         Initialize the recommendation engine
         
         Args:
             topics: Dictionary of topics with structure
+            bkt_params: Optional per-topic BKT parameter table
+                        (see core.bkt_fit.load_parameter_table)
+            forgetting: Optional ForgettingModel applied lazily on read
+            mastery_store: Optional shared MasteryStore; mastery_levels then
+                           becomes a view of this student's row
+            student_name: Row key in mastery_store
+            q_learner: Optional Q-Learning policy shared with other engines
+                       (see SharedQLearningRecommender)
+            recommendation_cache: Optional shared RecommendationCache
+            style_classifier: Optional shared LearningStyleClassifier,
+                              e.g. one loaded with population centroids
         """
         self.bkt = BayesianKnowledgeTracing()
-        self.q_learner = QLearningRecommender(topics)
-        self.style_classifier = LearningStyleClassifier()
+        self.topic_bkt = build_topic_models(bkt_params or {})
+        self.q_learner = q_learner if q_learner is not None else QLearningRecommender(topics)
+        self.style_classifier = style_classifier if style_classifier is not None else LearningStyleClassifier()
+        self.features = FeatureAccumulator()
+        # This student's current point in the online style centroids
+        self.style_point = None
         self.topics = topics
         
         # Initialize mastery levels for all topics
-        self.mastery_levels = {topic: 0.1 for topic in topics.keys()}
+        initial_mastery = {
+            topic: self.get_bkt(topic).p_init for topic in topics.keys()
+        }
+        if mastery_store is not None:
+            self.mastery_levels = mastery_store.row(student_name, initial_mastery)
+        else:
+            self.mastery_levels = initial_mastery
+        
+        # Epoch seconds of the last update per topic, used for forgetting
+        self.forgetting = forgetting
+        self.last_updated = {}
+        
+        # Bitmask of topics mastered above the prerequisite threshold
+        self.prereq_index = self.q_learner.prereq_index
+        self.mastered_mask = self.prereq_index.mastered_mask(self.mastery_levels)
+        
+        # Per-topic slip/guess vectors for batch predictions
+        self.topic_names = list(topics.keys())
+        self.topic_slip = np.array([self.get_bkt(t).p_slip for t in self.topic_names])
+        self.topic_guess = np.array([self.get_bkt(t).p_guess for t in self.topic_names])
+        
+        # Bumped on every change to mastery or responses; cached
+        # recommendations from older versions are never served
+        self.version = 0
+        self.recommendation_cache = recommendation_cache
+        self.cache_key = student_name if student_name is not None else id(self)
+        if recommendation_cache is not None:
+            # Versions restart with the engine; drop a previous engine's entry
+            recommendation_cache.invalidate(self.cache_key)
+    
+    def get_bkt(self, topic):
+        """Get the BKT model for a topic, falling back to the shared defaults"""
+        return self.topic_bkt.get(topic, self.bkt)
+    
+    def load_mastery(self, mastery_levels, last_updated=None):
+        """
+        Restore saved progress into the engine
+        
+        Args:
+            mastery_levels: Saved {topic: mastery}; unknown topics are ignored
+            last_updated: Saved {topic: epoch seconds} for forgetting
+        """
+        for topic, mastery in mastery_levels.items():
+            if topic in self.topics:
+                self.mastery_levels[topic] = mastery
+        self.last_updated = dict(last_updated or {})
+        self.mastered_mask = self.prereq_index.mastered_mask(self.mastery_levels)
+        self.version += 1
+    
+    def get_mastery(self, topic, now=None):
+        """
+        Get the current mastery of a topic, applying forgetting if enabled
+        
+        Args:
+            topic: Topic name
+            now: Read time in epoch seconds (defaults to the current time)
+            
+        Returns:
+            float: Mastery level (0-1)
+        """
+        p_init = self.get_bkt(topic).p_init
+        mastery = self.mastery_levels.get(topic, p_init)
+        updated_at = self.last_updated.get(topic)
+        if self.forgetting is None or updated_at is None:
+            return mastery
+        
+        now = time.time() if now is None else now
+        return self.forgetting.decay(mastery, now - updated_at, p_init)
+    
+    def get_mastery_levels(self, now=None):
+        """Get current mastery for every topic, applying forgetting if enabled"""
+        if self.forgetting is None:
+            return self.mastery_levels.copy()
+        
+        now = time.time() if now is None else now
+        return {topic: self.get_mastery(topic, now) for topic in self.topic_names}
+    
+    def get_mastered_mask(self, mastery_levels=None):
+        """
+        Get the prerequisite bitmask of mastered topics
+        
+        The incrementally maintained mask is exact unless forgetting is on,
+        in which case it is rebuilt from the decayed mastery levels.
+        
+        Args:
+            mastery_levels: Current mastery levels if already computed
+        """
+        if self.forgetting is None:
+            return self.mastered_mask
+        if mastery_levels is None:
+            mastery_levels = self.get_mastery_levels()
+        return self.prereq_index.mastered_mask(mastery_levels)
     
     def process_response(self, topic, is_correct, time_spent, attempts):
         """
@@ -39,48 +156,183 @@ class IntelliLearnEngine:
             dict: Updated mastery information
         """
         # Update mastery using BKT
-        current_mastery = self.mastery_levels[topic]
-        new_mastery = self.bkt.update_mastery(current_mastery, is_correct)
+        bkt = self.get_bkt(topic)
+        now = time.time()
+        current_mastery = self.get_mastery(topic, now)
+        new_mastery = bkt.update_mastery(current_mastery, is_correct)
         self.mastery_levels[topic] = new_mastery
+        self.last_updated[topic] = now
+        self.mastered_mask = self.prereq_index.update_mastered(
+            self.mastered_mask, topic, new_mastery
+        )
+        self.features.add(time_spent, attempts, is_correct)
+        if len(self.features) >= 3:
+            # Same warm-up predict_style uses before trusting the features
+            self.style_point = self.style_classifier.update_online(
+                self.features, self.style_point
+            )
+        self.version += 1
         
         return {
             'topic': topic,
             'previous_mastery': current_mastery,
             'new_mastery': new_mastery,
             'improvement': new_mastery - current_mastery,
-            'level': self.bkt.get_mastery_level(new_mastery)
+            'level': bkt.get_mastery_level(new_mastery)
         }
     
-    def get_recommendation(self, current_topic, responses):
+    def predict_correctness(self):
+        """
+        Predict P(correct on next question) for every topic
+        
+        Returns:
+            dict: {topic: probability of a correct answer}
+        """
+        mastery_levels = self.get_mastery_levels()
+        mastery = np.array([mastery_levels[t] for t in self.topic_names])
+        predicted = self.bkt.predict_correct_batch(
+            mastery, self.topic_slip, self.topic_guess
+        )
+        return dict(zip(self.topic_names, predicted.tolist()))
+    
+    def _project(self, topic, mastery, responses=1):
+        """Expected mastery after more responses on a topic"""
+        bkt = self.get_bkt(topic)
+        for _ in range(responses):
+            p_correct = bkt.predict_correct(mastery)
+            mastery = (p_correct * bkt.update_mastery(mastery, True)
+                       + (1 - p_correct) * bkt.update_mastery(mastery, False))
+        return mastery
+    
+    def plan_path(self, current_topic, depth=3, beam_width=4, practice=3):
+        """
+        Look ahead several topics with beam search over projected mastery
+        
+        Each expansion studies one available topic not yet on the path and
+        is scored by get_reward plus the Q-value of the move. A studied
+        topic is then projected forward by `practice` expected BKT updates,
+        which decides what its dependents unlock. Projected states depend
+        only on the set of studied topics, so branches reaching the same set
+        share one cache entry and at most beam_width x depth states are
+        projected.
+        
+        Args:
+            current_topic: Topic being studied, where the path starts
+            depth: Number of topics to look ahead
+            beam_width: Partial paths kept after each step
+            practice: Responses each planned topic is expected to take
+            
+        Returns:
+            dict: Planned 'path', its 'score' and 'projected_mastery'
+        """
+        mastery_levels = self.get_mastery_levels()
+        
+        # Studied topics -> (projected {topic: mastery}, mastered bitmask)
+        projected = {}
+        
+        def project(path):
+            studied = frozenset(path)
+            if studied not in projected:
+                topic = path[-1]
+                if len(path) > 1:
+                    parent, mastered = projected[frozenset(path[:-1])]
+                else:
+                    parent, mastered = {}, self.get_mastered_mask(mastery_levels)
+                mastery = self._project(topic, mastery_levels.get(topic, self.get_bkt(topic).p_init), practice)
+                projected[studied] = (
+                    dict(parent, **{topic: mastery}),
+                    self.prereq_index.update_mastered(mastered, topic, mastery)
+                )
+            return projected[studied]
+        
+        beam = [(0.0, (current_topic,))]
+        project(beam[0][1])
+        
+        for _ in range(depth):
+            # Keep the best partial path per (studied set, last topic)
+            candidates = {}
+            for score, path in beam:
+                studied = frozenset(path)
+                for topic in self.prereq_index.available_topics(projected[studied][1]):
+                    if topic in studied:
+                        continue
+                    total = score + self.q_learner.get_reward(
+                        mastery_levels.get(topic, self.get_bkt(topic).p_init),
+                        self.topics[topic]['difficulty'],
+                        True
+                    ) + self.q_learner.get_q_value(path[-1], topic)
+                    key = (studied | {topic}, topic)
+                    if key not in candidates or total > candidates[key][0]:
+                        candidates[key] = (total, path + (topic,))
+            if not candidates:
+                break
+            
+            beam = sorted(candidates.values(), key=lambda c: -c[0])[:beam_width]
+            for _, path in beam:
+                project(path)
+        
+        score, path = beam[0]
+        return {
+            'path': list(path[1:]),
+            'score': score,
+            'projected_mastery': projected[frozenset(path)][0]
+        }
+    
+    def _cache_version(self, now):
+        """Version a cached recommendation is valid for, plus a time window under forgetting"""
+        if self.forgetting is None:
+            return self.version
+        return (self.version, int(now // FORGETTING_CACHE_SECONDS))
+    
+    def get_recommendation(self, current_topic, responses=None, learn=True):
         """
         Get personalized learning recommendation
         
+        With a recommendation cache, repeated calls at the same version
+        return the stored result without recomputing it.
+        
         Args:
             current_topic: Current topic being studied
-            responses: List of all student responses
+            responses: Optional list of all student responses; by default
+                       the learning style comes from the running features
+                       process_response maintains
+            learn: Update the Q-value of the recommended move. Reads that
+                   do not follow an answer pass False; they also accept the
+                   recommendation cached at this version from any topic,
+                   since an answer moves current_topic to its next_topic
             
         Returns:
             dict: Recommendation with next topic and learning style
         """
+        cache = self.recommendation_cache
+        version = self._cache_version(time.time())
+        if cache is not None:
+            cached = cache.get(self.cache_key, version, current_topic if learn else None)
+            if cached is not None:
+                return cached
+        
+        mastery_levels = self.get_mastery_levels()
+        mastered = self.get_mastered_mask(mastery_levels)
+        
         # Get next topic from Q-Learning
         next_topic = self.q_learner.recommend_next(
             current_topic, 
-            self.mastery_levels
+            mastery_levels,
+            mastered
         )
         
         # Determine learning style using clustering
-        learning_style = self.style_classifier.predict_style(responses)
+        learning_style = self.style_classifier.predict_style(
+            self.features if responses is None else responses
+        )
         style_info = self.style_classifier.get_style_description(learning_style)
         
         # Calculate reward and update Q-Learning
-        if next_topic:
-            prereqs_met = all(
-                self.mastery_levels.get(p, 0) > 0.6 
-                for p in self.topics[next_topic]['prereqs']
-            )
+        if next_topic and learn:
+            prereqs_met = self.prereq_index.is_available(next_topic, mastered)
             
             reward = self.q_learner.get_reward(
-                self.mastery_levels.get(next_topic, 0.1),
+                mastery_levels.get(next_topic, self.get_bkt(next_topic).p_init),
                 self.topics[next_topic]['difficulty'],
                 prereqs_met
             )
@@ -92,10 +344,13 @@ class IntelliLearnEngine:
                 next_topic
             )
         
-        return {
+        recommendation = {
             'next_topic': next_topic,
-            'mastery_level': self.mastery_levels.get(next_topic, 0),
+            'mastery_level': mastery_levels.get(next_topic, self.get_bkt(next_topic).p_init),
             'learning_style': learning_style,
             'style_info': style_info,
-            'all_mastery': self.mastery_levels.copy()
+            'all_mastery': mastery_levels
         }
+        if cache is not None:
+            cache.put(self.cache_key, version, current_topic, recommendation)
+        return recommendation
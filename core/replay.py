@@ -0,0 +1,224 @@
+"""
+Streaming Mastery Replay
+Rebuilds every student's mastery levels from the raw response log
+"""
+
+import time
+from itertools import islice
+
+import numpy as np
+
+from .bkt import BayesianKnowledgeTracing
+from .bkt_fit import build_topic_models
+
+class MasteryReplayer:
+    """Replays response events through BKT in vectorized chunks"""
+    
+    def __init__(self, topics, bkt_params=None):
+        """
+        Initialize the replayer
+        
+        Args:
+            topics: Dictionary of topics with structure
+            bkt_params: Optional per-topic BKT parameter table
+        """
+        self.topics = topics
+        self.bkt = BayesianKnowledgeTracing()
+        self.topic_bkt = build_topic_models(bkt_params or {})
+        self.topic_ids = {topic: i for i, topic in enumerate(topics)}
+        self.models = [self.topic_bkt.get(topic, self.bkt) for topic in topics]
+        
+        # One slot per (student, topic) pair seen so far
+        self.pair_index = {}
+        self.pair_topic = np.zeros(1024, dtype=np.int32)
+        self.mastery = np.zeros(1024, dtype=np.float64)
+        self.updated_at = np.zeros(1024, dtype=np.float64)
+        
+        self.events = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+    
+    def _pair(self, student_name, topic_id):
+        """Get or create the state slot for a (student, topic) pair"""
+        key = (student_name, topic_id)
+        index = self.pair_index.get(key)
+        if index is None:
+            index = len(self.pair_index)
+            if index == len(self.mastery):
+                self.mastery = np.resize(self.mastery, 2 * index)
+                self.pair_topic = np.resize(self.pair_topic, 2 * index)
+                self.updated_at = np.resize(self.updated_at, 2 * index)
+            self.pair_index[key] = index
+            self.pair_topic[index] = topic_id
+            self.mastery[index] = self.models[topic_id].p_init
+            self.updated_at[index] = 0.0
+        return index
+    
+    def replay_chunk(self, events):
+        """
+        Apply one chunk of chronologically ordered events
+        
+        Events are grouped into runs of identical outcomes per pair, and the
+        n-th run of every pair of a topic is applied in the same vectorized
+        step. Runs are sorted by (topic, rank) once, so each step updates a
+        contiguous slice and the total work stays linear in the chunk size.
+        
+        Args:
+            events: List of response event dicts
+        """
+        pairs = []
+        outcomes = []
+        timestamps = []
+        for event in events:
+            topic_id = self.topic_ids.get(event['topic'])
+            if topic_id is None:
+                self.skipped += 1
+                continue
+            pairs.append(self._pair(event['student_name'], topic_id))
+            outcomes.append(bool(event['is_correct']))
+            timestamps.append(float(event.get('timestamp') or 0))
+        
+        self.events += len(pairs)
+        if not pairs:
+            return
+        
+        pairs = np.array(pairs, dtype=np.int64)
+        outcomes = np.array(outcomes, dtype=bool)
+        np.maximum.at(self.updated_at, pairs, np.array(timestamps, dtype=np.float64))
+        
+        # Stable sort keeps each pair's events in chronological order
+        order = np.argsort(pairs, kind='stable')
+        pairs = pairs[order]
+        outcomes = outcomes[order]
+        
+        # Collapse consecutive identical outcomes of a pair into runs
+        starts = np.flatnonzero(np.concatenate((
+            [True], (pairs[1:] != pairs[:-1]) | (outcomes[1:] != outcomes[:-1])
+        )))
+        run_pairs = pairs[starts]
+        run_outcomes = outcomes[starts]
+        run_lengths = np.diff(np.append(starts, len(pairs)))
+        
+        # Position of each run within its pair's sequence of runs
+        new_pair = np.concatenate(([True], run_pairs[1:] != run_pairs[:-1]))
+        first_run = np.maximum.accumulate(np.where(new_pair, np.arange(len(run_pairs)), 0))
+        run_rank = np.arange(len(run_pairs)) - first_run
+        run_topics = self.pair_topic[run_pairs]
+        
+        # Sort runs by (topic, rank) once so every step updates a contiguous slice
+        order = np.lexsort((run_rank, run_topics))
+        run_pairs = run_pairs[order]
+        run_outcomes = run_outcomes[order]
+        run_lengths = run_lengths[order]
+        run_topics = run_topics[order]
+        run_rank = run_rank[order]
+        
+        bounds = np.flatnonzero(np.diff(run_topics) | np.diff(run_rank)) + 1
+        bounds = np.concatenate(([0], bounds, [len(run_pairs)]))
+        for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            model = self.models[run_topics[start]]
+            if stop - start == 1:
+                # Long runs of a single pair are mostly one-element steps
+                target = run_pairs[start]
+                self.mastery[target] = model.update_mastery_run(
+                    float(self.mastery[target]), bool(run_outcomes[start]), int(run_lengths[start])
+                )
+                continue
+            targets = run_pairs[start:stop]
+            self.mastery[targets] = model.update_mastery_run_batch(
+                self.mastery[targets],
+                run_outcomes[start:stop],
+                run_lengths[start:stop]
+            )
+    
+    def replay(self, events, chunk_size=50000):
+        """
+        Replay a whole event stream
+        
+        Args:
+            events: Iterable of response events in chronological order
+            chunk_size: Number of events processed per vectorized step
+        
+        Returns:
+            dict: Throughput statistics
+        """
+        events = iter(events)
+        start = time.perf_counter()
+        while True:
+            chunk = list(islice(events, chunk_size))
+            if not chunk:
+                break
+            self.replay_chunk(chunk)
+        self.elapsed += time.perf_counter() - start
+        
+        return self.get_stats()
+    
+    def get_stats(self):
+        """Get replay throughput statistics"""
+        return {
+            'events': self.events,
+            'skipped': self.skipped,
+            'pairs': len(self.pair_index),
+            'seconds': self.elapsed,
+            'events_per_second': self.events / self.elapsed if self.elapsed > 0 else 0.0
+        }
+    
+    def iter_mastery_levels(self):
+        """
+        Yield the rebuilt mastery of every replayed student
+        
+        Topics without events start at their initial mastery and get no
+        timestamp, as do topics whose events carry none.
+        
+        Yields:
+            tuple: (student_name, mastery_levels dict,
+                    {topic: epoch seconds of the last replayed event})
+        """
+        by_student = {}
+        for (student_name, topic_id), index in self.pair_index.items():
+            by_student.setdefault(student_name, []).append((topic_id, index))
+        
+        topic_names = list(self.topics)
+        for student_name, entries in by_student.items():
+            mastery_levels = {
+                topic: model.p_init for topic, model in zip(topic_names, self.models)
+            }
+            mastery_timestamps = {}
+            for topic_id, index in entries:
+                mastery_levels[topic_names[topic_id]] = float(self.mastery[index])
+                if self.updated_at[index] > 0:
+                    mastery_timestamps[topic_names[topic_id]] = float(self.updated_at[index])
+            yield student_name, mastery_levels, mastery_timestamps
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import os
+    import sys
+    
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.bkt_fit import PARAMS_PATH, load_parameter_table
+    from utils.mastery_state import DB_PATH, save_mastery_bulk
+    from utils.response_log import iter_responses
+    
+    parser = argparse.ArgumentParser(description='Rebuild mastery levels from the response log')
+    parser.add_argument('--source', default=DB_PATH, help='Response log (.jsonl, .csv or SQLite)')
+    parser.add_argument('--topics', default=os.path.join('data', 'topics_graph.json'))
+    parser.add_argument('--params', default=PARAMS_PATH, help='Per-topic BKT parameter table')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--dry-run', action='store_true', help='Replay without writing back')
+    args = parser.parse_args()
+    
+    with open(args.topics, 'r') as f:
+        topics = json.load(f)
+    
+    replayer = MasteryReplayer(topics, load_parameter_table(args.params))
+    stats = replayer.replay(iter_responses(args.source), args.chunk_size)
+    
+    print(f"🔁 Replayed {stats['events']} events for {stats['pairs']} student/topic pairs")
+    print(f"   {stats['events_per_second']:,.0f} events/s ({stats['skipped']} skipped)")
+    
+    if not args.dry_run:
+        save_mastery_bulk(replayer.iter_mastery_levels())
+        print("✓ Mastery levels written back")
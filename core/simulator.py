@@ -0,0 +1,231 @@
+"""
+Synthetic Student Simulator
+Trains the Q-Learning policy on simulated students instead of real ones
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .bkt import BayesianKnowledgeTracing
+from .bkt_fit import build_topic_models
+from .q_learning import QLearningRecommender
+from .q_trainer import OfflineQTrainer
+
+class StudentSimulator:
+    """Simulates batches of BKT students driven by a dense Q-Learning policy"""
+    
+    def __init__(self, topics, recommender=None, bkt_params=None, seed=None):
+        """
+        Initialize the simulator
+        
+        Args:
+            topics: Dictionary of topics with structure
+            recommender: Dense QLearningRecommender to train (created if None)
+            bkt_params: Optional per-topic BKT parameter table; the same
+                        parameters generate the students and trace mastery
+            seed: Seed or numpy SeedSequence for the random generator
+        """
+        self.topics = topics
+        self.recommender = recommender or QLearningRecommender(topics, dense=True)
+        self.trainer = OfflineQTrainer(self.recommender, seed=seed)
+        self.rng = np.random.default_rng(seed)
+        
+        default_bkt = BayesianKnowledgeTracing()
+        topic_bkt = build_topic_models(bkt_params or {})
+        models = [topic_bkt.get(t, default_bkt) for t in self.recommender.topics]
+        self.bkt = default_bkt
+        self.p_init = np.array([m.p_init for m in models])
+        self.p_learn = np.array([m.p_learn for m in models])
+        self.p_slip = np.array([m.p_slip for m in models])
+        self.p_guess = np.array([m.p_guess for m in models])
+        
+        # prereqs[i, j] as float so unmet prerequisites are one matmul
+        self.prereqs = self.recommender.prereq_index.prereq_matrix().astype(np.float32)
+        self.threshold = self.recommender.prereq_index.threshold
+        
+        n_topics = len(self.recommender.topics)
+        self.visits = np.zeros((n_topics, n_topics), dtype=np.int64)
+    
+    def _available(self, mastery):
+        """Students x topics availability from estimated mastery"""
+        unmastered = (mastery <= self.threshold).astype(np.float32)
+        return unmastered @ self.prereqs.T == 0
+    
+    def run_batch(self, n_students=1000, steps=20, learn=True):
+        """
+        Simulate one episode for each of n_students students at once
+        
+        Args:
+            n_students: Number of simulated students (one episode each)
+            steps: Topics studied per episode
+            learn: Apply Q-Learning updates to the recommender
+        
+        Returns:
+            dict: Batch statistics (episodes, rewards and learning gain)
+        """
+        n_topics = len(self.recommender.topics)
+        rows = np.arange(n_students)
+        epsilon = self.recommender.epsilon
+        
+        known = self.rng.random((n_students, n_topics)) < self.p_init
+        known_start = known.mean(axis=1)
+        mastery = np.tile(self.p_init, (n_students, 1))
+        current = np.zeros(n_students, dtype=np.int64)
+        total_reward = np.zeros(n_students)
+        
+        for _ in range(steps):
+            available = self._available(mastery)
+            # Students with nothing available fall back to the first topic
+            available[~available.any(axis=1), 0] = True
+            
+            # Epsilon-greedy as one masked argmax per student
+            explore = self.rng.random(n_students) < epsilon
+            scores = np.where(
+                explore[:, None],
+                self.rng.random((n_students, n_topics)),
+                self.recommender.q_table[current]
+            )
+            action = np.argmax(np.where(available, scores, -np.inf), axis=1)
+            
+            mastery_before = mastery[rows, action]
+            reward = self.recommender.get_reward_batch(
+                mastery_before,
+                self.recommender.topic_difficulty[action],
+                available[rows, action]
+            )
+            total_reward += reward
+            
+            # Answer from the hidden state, then possibly learn the topic
+            p_correct = np.where(
+                known[rows, action], 1 - self.p_slip[action], self.p_guess[action]
+            )
+            correct = self.rng.random(n_students) < p_correct
+            known[rows, action] |= self.rng.random(n_students) < self.p_learn[action]
+            
+            mastery[rows, action] = self.bkt.update_mastery_batch(
+                mastery_before, correct,
+                self.p_learn[action], self.p_slip[action], self.p_guess[action]
+            )
+            
+            if learn:
+                self.trainer.train_batch(current, action, reward, action)
+            np.add.at(self.visits, (current, action), 1)
+            current = action
+        
+        return {
+            'episodes': n_students,
+            'steps': n_students * steps,
+            'avg_reward': float(total_reward.mean() / steps),
+            'learning_gain': float((known.mean(axis=1) - known_start).mean())
+        }
+    
+    def run(self, n_batches=10, n_students=1000, steps=20, learn=True):
+        """
+        Run several batches and aggregate their statistics
+        
+        Returns:
+            dict: Totals plus episodes per second and average learning gain
+        """
+        start = time.perf_counter()
+        batches = [self.run_batch(n_students, steps, learn) for _ in range(n_batches)]
+        elapsed = time.perf_counter() - start
+        return _summarize(batches, elapsed)
+
+
+def _summarize(batches, elapsed):
+    """Combine per-batch statistics"""
+    episodes = sum(b['episodes'] for b in batches)
+    return {
+        'episodes': episodes,
+        'seconds': elapsed,
+        'episodes_per_second': episodes / elapsed if elapsed > 0 else 0.0,
+        'avg_reward': float(np.mean([b['avg_reward'] for b in batches])) if batches else 0.0,
+        'learning_gain': float(np.mean([b['learning_gain'] for b in batches])) if batches else 0.0
+    }
+
+def _simulate_worker(job):
+    """Process pool entry point: train a private table on its own seed"""
+    topics, bkt_params, seed, n_batches, n_students, steps = job
+    simulator = StudentSimulator(topics, bkt_params=bkt_params, seed=seed)
+    stats = simulator.run(n_batches, n_students, steps)
+    return stats, np.asarray(simulator.recommender.q_table), simulator.visits
+
+def simulate_parallel(topics, workers=4, n_batches=10, n_students=1000, steps=20,
+                      bkt_params=None, seed=None):
+    """
+    Run independent simulators across a process pool
+    
+    Every worker gets its own child of one SeedSequence, so runs are
+    reproducible for a given seed and workers never share random streams.
+    
+    Args:
+        topics: Dictionary of topics with structure
+        workers: Number of worker processes
+        n_batches: Batches per worker
+        n_students: Simulated students per batch
+        steps: Topics studied per episode
+        bkt_params: Optional per-topic BKT parameter table
+        seed: Root seed
+    
+    Returns:
+        tuple: (statistics dict, Q-table averaged over workers)
+    """
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    jobs = [(topics, bkt_params, s, n_batches, n_students, steps) for s in seeds]
+    
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_simulate_worker, jobs))
+    elapsed = time.perf_counter() - start
+    
+    episodes = sum(stats['episodes'] for stats, _, _ in results)
+    summary = {
+        'workers': workers,
+        'episodes': episodes,
+        'seconds': elapsed,
+        'episodes_per_second': episodes / elapsed if elapsed > 0 else 0.0,
+        'avg_reward': float(np.mean([stats['avg_reward'] for stats, _, _ in results])),
+        'learning_gain': float(np.mean([stats['learning_gain'] for stats, _, _ in results]))
+    }
+    q_table = np.mean([table for _, table, _ in results], axis=0)
+    return summary, q_table
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import os
+    import sys
+    
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.bkt_fit import PARAMS_PATH, load_parameter_table
+    
+    parser = argparse.ArgumentParser(description='Train the Q-table on simulated students')
+    parser.add_argument('--topics', default=os.path.join('data', 'topics_graph.json'))
+    parser.add_argument('--params', default=PARAMS_PATH, help='Per-topic BKT parameter table')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help='Optional binary Q-model to write')
+    args = parser.parse_args()
+    
+    with open(args.topics, 'r') as f:
+        topics = json.load(f)
+    
+    stats, q_table = simulate_parallel(
+        topics, args.workers, args.batches, args.students, args.steps,
+        load_parameter_table(args.params), args.seed
+    )
+    print(f"🎓 {stats['episodes']} episodes on {stats['workers']} workers")
+    print(f"   {stats['episodes_per_second']:,.0f} episodes/s, "
+          f"avg learning gain {stats['learning_gain']:.3f}, avg reward {stats['avg_reward']:.2f}")
+    
+    if args.output:
+        recommender = QLearningRecommender(topics, dense=True)
+        recommender.q_table = q_table
+        recommender.save_binary(args.output)
+        print(f"✓ Saved {args.output}")
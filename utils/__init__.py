@@ -1,2 +1,2 @@
 """Utility functions"""
-from .mastery_state import save_student_progress, load_student_progress
+from .mastery_state import save_student_progress, load_student_progress, log_response
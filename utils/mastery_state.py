@@ -5,13 +5,24 @@ Database utilities for storing student progress
 import sqlite3
 import json
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
 DB_PATH = os.path.join('data', 'student_data.db')
 
-def init_database():
-    """Initialize SQLite database"""
-    conn = sqlite3.connect(DB_PATH)
+# Applied to every new connection; WAL lets readers run alongside a writer
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY"
+)
+
+def _create_schema(conn):
+    """Create the tables (idempotent)"""
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -20,51 +31,271 @@ def init_database():
             student_name TEXT NOT NULL UNIQUE,
             mastery_levels TEXT NOT NULL,
             learning_style TEXT,
-            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            mastery_timestamps TEXT,
+            session_state TEXT
+        )
+    """)
+    
+    # Older databases lack the forgetting timestamps and session state columns
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(student_progress)")]
+    for column in ('mastery_timestamps', 'session_state'):
+        if column not in columns:
+            try:
+                cursor.execute(f"ALTER TABLE student_progress ADD COLUMN {column} TEXT")
+            except sqlite3.OperationalError:
+                pass  # Another process migrated it first
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS response_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_name TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            is_correct INTEGER NOT NULL,
+            time_spent REAL,
+            attempts INTEGER,
+            timestamp REAL NOT NULL
         )
     """)
     
     conn.commit()
-    conn.close()
-    print("✓ Database initialized")
 
-def save_student_progress(student_name, mastery_levels, learning_style=None):
-    """Save student progress to database"""
-    init_database()
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+class ConnectionManager:
+    """
+    Bounded pool of persistent SQLite connections to one database
     
-    mastery_json = json.dumps(mastery_levels)
+    Connections are checked out per call and returned afterwards, so they
+    are reused whether callers run on long-lived threads or, like the
+    Werkzeug server behind app.run, on a new thread per request.
+    """
     
-    cursor.execute("""
-        INSERT OR REPLACE INTO student_progress 
-        (student_name, mastery_levels, learning_style, last_updated)
-        VALUES (?, ?, ?, ?)
-    """, (student_name, mastery_json, learning_style, datetime.now()))
+    def __init__(self, db_path=DB_PATH, pool_size=8, cached_statements=128, timeout=30):
+        """
+        Initialize the manager; nothing is opened until first use
+        
+        Args:
+            db_path: SQLite database file
+            pool_size: Idle connections kept; extra ones opened under load
+                       are closed when returned
+            cached_statements: Prepared statements kept per connection
+            timeout: Seconds to wait on a locked database
+        """
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._pid = os.getpid()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self.opened = 0
     
-    conn.commit()
-    conn.close()
+    def open(self):
+        """Open a new configured connection outside the pool"""
+        # Pooled connections move between threads, one holder at a time
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        self.opened += 1
+        
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    _create_schema(conn)
+                    self._schema_ready = True
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """
+        Check a connection out of the pool for the duration of a with block
+        
+        Connections inherited through fork are never reused; the child
+        starts an empty pool.
+        """
+        if self._pid != os.getpid():
+            self._pool = queue.LifoQueue(maxsize=self.pool_size)
+            self._pid = os.getpid()
+        pool = self._pool
+        
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = self.open()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    def close(self):
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
 
-def load_student_progress(student_name):
-    """Load student progress from database"""
-    if not os.path.exists(DB_PATH):
-        return None
+_connections = ConnectionManager()
+
+def use_database(db_path):
+    """
+    Point every function in this module at another database file
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    Returns:
+        ConnectionManager: The new manager
+    """
+    global _connections
+    _connections = ConnectionManager(db_path)
+    return _connections
+
+def get_connection():
+    """Check out a pooled connection to the progress database (a context manager)"""
+    return _connections.connection()
+
+def open_connection():
+    """Open a dedicated connection, e.g. for a long-running writer thread"""
+    return _connections.open()
+
+def init_database():
+    """Initialize SQLite database"""
+    with get_connection():
+        pass
+    print("✓ Database initialized")
+
+def save_student_progress(student_name, mastery_levels, learning_style=None,
+                          mastery_timestamps=None, session_state=None):
+    """
+    Save student progress to database
     
-    cursor.execute("""
-        SELECT mastery_levels, learning_style
-        FROM student_progress
-        WHERE student_name = ?
-    """, (student_name,))
+    Args:
+        student_name: Student identifier
+        mastery_levels: {topic: mastery} as of the last update of each topic
+        learning_style: Current learning style
+        mastery_timestamps: Optional {topic: epoch seconds of last update}
+        session_state: Optional JSON-serializable session fields (running
+                       totals, current topic) restored on rehydration; None
+                       keeps the saved ones
+    """
+    mastery_json = json.dumps(dict(mastery_levels))
+    timestamps_json = json.dumps(mastery_timestamps) if mastery_timestamps else None
+    state_json = json.dumps(session_state) if session_state else None
+    
+    with get_connection() as conn, conn:
+        conn.execute("""
+            INSERT INTO student_progress
+            (student_name, mastery_levels, learning_style, last_updated, mastery_timestamps,
+             session_state)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(student_name) DO UPDATE SET
+                mastery_levels = excluded.mastery_levels,
+                learning_style = excluded.learning_style,
+                last_updated = excluded.last_updated,
+                mastery_timestamps = excluded.mastery_timestamps,
+                session_state = COALESCE(excluded.session_state, student_progress.session_state)
+        """, (student_name, mastery_json, learning_style, datetime.now(), timestamps_json,
+              state_json))
+
+def save_mastery_bulk(mastery_by_student):
+    """
+    Write mastery levels for many students in a single transaction
     
-    result = cursor.fetchone()
-    conn.close()
+    Existing learning styles and session state are kept; mastery levels and
+    per-topic timestamps are replaced, so forgetting decays the written
+    mastery from the given times.
+    
+    Args:
+        mastery_by_student: Iterable of (student_name, mastery_levels,
+                            mastery_timestamps) tuples
+    """
+    now = datetime.now()
+    
+    with get_connection() as conn, conn:
+        conn.executemany("""
+            INSERT INTO student_progress
+            (student_name, mastery_levels, last_updated, mastery_timestamps)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(student_name) DO UPDATE SET
+                mastery_levels = excluded.mastery_levels,
+                last_updated = excluded.last_updated,
+                mastery_timestamps = excluded.mastery_timestamps
+        """, (
+            (student_name, json.dumps(dict(mastery_levels)), now,
+             json.dumps(mastery_timestamps) if mastery_timestamps else None)
+            for student_name, mastery_levels, mastery_timestamps in mastery_by_student
+        ))
+
+def log_response(student_name, topic, is_correct, time_spent=30, attempts=1, timestamp=None):
+    """Append a single answer to the response log"""
+    with get_connection() as conn, conn:
+        conn.execute("""
+            INSERT INTO response_log
+            (student_name, topic, is_correct, time_spent, attempts, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (student_name, topic, int(bool(is_correct)), time_spent, attempts,
+              timestamp if timestamp is not None else time.time()))
+
+def write_batch(progress_records=(), responses=(), conn=None):
+    """
+    Write many progress saves and logged answers in one transaction
+    
+    Args:
+        progress_records: Iterable of (student_name, mastery_levels,
+                          learning_style, mastery_timestamps, session_state)
+                          tuples
+        responses: Iterable of (student_name, topic, is_correct,
+                   time_spent, attempts, timestamp) tuples
+        conn: Connection to write through (defaults to a pooled one)
+    """
+    if conn is None:
+        with get_connection() as conn:
+            return write_batch(progress_records, responses, conn)
+    now = datetime.now()
+    
+    with conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO student_progress 
+            (student_name, mastery_levels, learning_style, last_updated, mastery_timestamps,
+             session_state)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            (student_name, json.dumps(dict(mastery_levels)), learning_style, now,
+             json.dumps(mastery_timestamps) if mastery_timestamps else None,
+             json.dumps(session_state) if session_state else None)
+            for student_name, mastery_levels, learning_style, mastery_timestamps, session_state
+            in progress_records
+        ))
+        conn.executemany("""
+            INSERT INTO response_log
+            (student_name, topic, is_correct, time_spent, attempts, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            (student_name, topic, int(bool(is_correct)), time_spent, attempts, timestamp)
+            for student_name, topic, is_correct, time_spent, attempts, timestamp in responses
+        ))
+
+def load_student_progress(student_name):
+    """Load student progress from database"""
+    with get_connection() as conn:
+        result = conn.execute("""
+            SELECT mastery_levels, learning_style, mastery_timestamps, session_state
+            FROM student_progress
+            WHERE student_name = ?
+        """, (student_name,)).fetchone()
     
     if result:
         return {
             'mastery_levels': json.loads(result[0]),
-            'learning_style': result[1]
+            'learning_style': result[1],
+            'mastery_timestamps': json.loads(result[2]) if result[2] else {},
+            'session_state': json.loads(result[3]) if result[3] else None
         }
     return None
@@ -0,0 +1,124 @@
+"""
+Compact per-session response history
+A fixed-capacity ring buffer of typed arrays that iterates like a list of dicts
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+class ResponseHistory:
+    """The most recent responses of one student, 17 bytes each"""
+    
+    def __init__(self, topics, capacity=1000):
+        """
+        Allocate the ring buffer
+        
+        Args:
+            topics: Topic names (or the topics dict) in index order
+            capacity: Responses kept; older ones are overwritten
+        
+        Arrays start small and double until they reach capacity, so short
+        sessions do not pay for the full buffer.
+        """
+        self.topic_names = list(topics)
+        self.topic_index = {topic: i for i, topic in enumerate(self.topic_names)}
+        self.capacity = capacity
+        
+        size = min(16, capacity)
+        self.topics = np.zeros(size, dtype=np.int16)
+        self.correct = np.zeros(size, dtype=bool)
+        self.time_spent = np.zeros(size, dtype=np.float32)
+        self.attempts = np.zeros(size, dtype=np.int16)
+        self.timestamps = np.zeros(size, dtype=np.float64)
+        
+        # Next slot to write and the number of valid slots
+        self._head = 0
+        self._size = 0
+        
+        # Running totals cover every response, not just the retained ones
+        self.total = 0
+        self.total_correct = 0
+        self.total_time = 0.0
+    
+    def _grow(self):
+        """Double the arrays; only happens before the buffer first wraps"""
+        size = min(len(self.topics) * 2, self.capacity)
+        for name in ('topics', 'correct', 'time_spent', 'attempts', 'timestamps'):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._head = self._size
+    
+    def append(self, topic, is_correct, time_spent=30, attempts=1, timestamp=None):
+        """
+        Record one response, overwriting the oldest when full
+        
+        Args:
+            topic: Topic name
+            is_correct: Whether the answer was correct
+            time_spent: Time spent on the question (seconds)
+            attempts: Number of attempts made
+            timestamp: Epoch seconds (defaults to now)
+        """
+        index = self.topic_index.get(topic)
+        if index is None:
+            index = self.topic_index[topic] = len(self.topic_names)
+            self.topic_names.append(topic)
+        
+        if self._size == len(self.topics) < self.capacity:
+            self._grow()
+        
+        i = self._head
+        self.topics[i] = index
+        self.correct[i] = bool(is_correct)
+        self.time_spent[i] = time_spent
+        self.attempts[i] = attempts
+        self.timestamps[i] = time.time() if timestamp is None else timestamp
+        
+        self._head = (i + 1) % len(self.topics)
+        self._size = min(self._size + 1, self.capacity)
+        self.total += 1
+        self.total_correct += bool(is_correct)
+        self.total_time += time_spent
+    
+    def _order(self):
+        """Slot indices of the retained responses, oldest first"""
+        start = (self._head - self._size) % len(self.topics)
+        return (start + np.arange(self._size)) % len(self.topics)
+    
+    def __len__(self):
+        return self._size
+    
+    def __iter__(self):
+        """Yield response dicts in the shape submit_answer used to store"""
+        for i in self._order().tolist():
+            yield {
+                'topic': self.topic_names[self.topics[i]],
+                'is_correct': bool(self.correct[i]),
+                'time_spent': float(self.time_spent[i]),
+                'attempts': int(self.attempts[i]),
+                'timestamp': datetime.fromtimestamp(self.timestamps[i]).isoformat()
+            }
+    
+    def to_dict(self):
+        """Get the running totals; retained responses are not included"""
+        return {
+            'total': self.total,
+            'total_correct': self.total_correct,
+            'total_time': self.total_time
+        }
+    
+    def load_dict(self, state):
+        """Restore running totals saved by to_dict"""
+        self.total = state['total']
+        self.total_correct = state['total_correct']
+        self.total_time = state['total_time']
+    
+    def nbytes(self):
+        """Memory held by the ring buffer arrays"""
+        return sum(a.nbytes for a in (
+            self.topics, self.correct, self.time_spent, self.attempts, self.timestamps
+        ))
@@ -0,0 +1,147 @@
+"""
+Streaming readers for logged student responses
+Every reader yields events one at a time so arbitrarily large logs
+can be processed in constant memory
+"""
+
+import csv
+import json
+import sqlite3
+
+import numpy as np
+
+from .mastery_state import DB_PATH
+
+def _normalize_event(raw):
+    """Coerce a raw record into the standard response event dict"""
+    is_correct = raw.get('is_correct', False)
+    if isinstance(is_correct, str):
+        is_correct = is_correct.strip().lower() in ('1', 'true', 'yes')
+    
+    return {
+        'student_name': raw['student_name'],
+        'topic': raw['topic'],
+        'is_correct': bool(is_correct),
+        'time_spent': float(raw.get('time_spent') or 30),
+        'attempts': int(raw.get('attempts') or 1),
+        'timestamp': float(raw.get('timestamp') or 0)
+    }
+
+def iter_jsonl_responses(filepath):
+    """
+    Stream response events from a JSON Lines file
+    
+    Args:
+        filepath: Path to a file with one JSON object per line
+    
+    Yields:
+        dict: Response event
+    """
+    with open(filepath, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield _normalize_event(json.loads(line))
+
+def iter_csv_responses(filepath):
+    """
+    Stream response events from a CSV file with a header row
+    
+    Args:
+        filepath: Path to a CSV file with student_name, topic and is_correct
+                  columns (time_spent, attempts and timestamp are optional)
+    
+    Yields:
+        dict: Response event
+    """
+    with open(filepath, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            yield _normalize_event(row)
+
+def iter_sqlite_responses(db_path=DB_PATH, chunk_size=10000):
+    """
+    Stream response events from the response_log table in insertion order
+    
+    Args:
+        db_path: SQLite database holding the response_log table
+        chunk_size: Number of rows fetched per round trip
+    
+    Yields:
+        dict: Response event
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT student_name, topic, is_correct, time_spent, attempts, timestamp
+            FROM response_log
+            ORDER BY id
+        """)
+        
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield {
+                    'student_name': row[0],
+                    'topic': row[1],
+                    'is_correct': bool(row[2]),
+                    'time_spent': row[3] if row[3] is not None else 30.0,
+                    'attempts': row[4] if row[4] is not None else 1,
+                    'timestamp': row[5]
+                }
+    finally:
+        conn.close()
+
+def iter_student_features(db_path=DB_PATH, chunk_size=10000, min_responses=3):
+    """
+    Stream per-student behavioral features aggregated by SQLite
+    
+    Args:
+        db_path: SQLite database holding the response_log table
+        chunk_size: Number of students fetched per round trip
+        min_responses: Students with fewer responses are skipped
+    
+    Yields:
+        tuple: (student names, n x 3 array of avg_time, avg_attempts, accuracy)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT student_name,
+                   AVG(COALESCE(time_spent, 30)),
+                   AVG(COALESCE(attempts, 1)),
+                   AVG(is_correct)
+            FROM response_log
+            GROUP BY student_name
+            HAVING COUNT(*) >= ?
+        """, (min_responses,))
+        
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            names = [row[0] for row in rows]
+            yield names, np.array([row[1:] for row in rows], dtype=np.float64)
+    finally:
+        conn.close()
+
+def iter_responses(source):
+    """
+    Stream response events from a file, picking the reader by extension
+    
+    Args:
+        source: Path to a .jsonl, .csv or SQLite (.db/.sqlite) file
+    
+    Yields:
+        dict: Response event
+    """
+    if source.endswith(('.jsonl', '.json')):
+        return iter_jsonl_responses(source)
+    if source.endswith('.csv'):
+        return iter_csv_responses(source)
+    if source.endswith(('.db', '.sqlite', '.sqlite3')):
+        return iter_sqlite_responses(source)
+    raise ValueError(f"Unsupported response log format: {source}")
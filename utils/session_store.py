@@ -0,0 +1,198 @@
+"""
+LRU session store for active students
+Bounds resident sessions, evicts idle ones and rehydrates them on demand
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from .mastery_state import save_student_progress
+
+def write_back_session(student_name, session_data):
+    """Persist one session's progress through mastery_state, keeping its saved session state"""
+    engine = session_data['engine']
+    save_student_progress(
+        student_name,
+        engine.mastery_levels,
+        session_data.get('learning_style'),
+        engine.last_updated
+    )
+
+class SessionStore:
+    """
+    Dict-like map of student name -> session data with LRU and TTL eviction
+    
+    Only resident sessions are kept in memory; an evicted student is
+    rebuilt by the factory from what write_back saved. The store lock
+    guards the LRU map alone. Rehydration and write-back run outside it
+    with the student marked busy, so other requests for that student
+    wait while requests for everyone else go ahead.
+    """
+    
+    def __init__(self, factory, max_resident=1000, ttl_seconds=1800,
+                 sweep_interval=60, write_back=write_back_session):
+        """
+        Initialize the store
+        
+        Args:
+            factory: Callable(student_name) rebuilding an evicted session
+                     from saved state, or returning None if nothing is saved
+            max_resident: Maximum sessions kept in memory
+            ttl_seconds: Idle time after which the sweeper evicts a session
+            sweep_interval: Seconds between sweeps (see start_sweeper)
+            write_back: Callable(student_name, session_data) run on eviction
+        """
+        self.factory = factory
+        self.max_resident = max_resident
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self.write_back = write_back
+        
+        # name -> [session data, last access time], least recently used first
+        self._sessions = OrderedDict()
+        # name -> Event set once the student's rehydration or write-back ends
+        self._busy = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._sweeper = None
+        
+        self.evictions = 0
+        self.rehydrations = 0
+    
+    def __contains__(self, student_name):
+        """Check for a resident or rehydratable session (rehydrating it)"""
+        return self.get(student_name) is not None
+    
+    def _touch(self, student_name, entry):
+        entry[1] = time.monotonic()
+        self._sessions.move_to_end(student_name)
+        return entry[0]
+    
+    def __getitem__(self, student_name):
+        """Get a session, rehydrating it if it was evicted"""
+        while True:
+            with self._lock:
+                entry = self._sessions.get(student_name)
+                if entry is not None:
+                    return self._touch(student_name, entry)
+                busy = self._busy.get(student_name)
+                if busy is None:
+                    busy = self._busy[student_name] = threading.Event()
+                    break
+            # Another thread is rehydrating or writing back this student
+            busy.wait()
+        
+        session_data = None
+        victims = []
+        try:
+            session_data = self.factory(student_name)
+        finally:
+            with self._lock:
+                del self._busy[student_name]
+                if session_data is not None:
+                    self._sessions[student_name] = [session_data, time.monotonic()]
+                    self.rehydrations += 1
+                    victims = self._pop_over_capacity()
+            busy.set()
+        
+        self._write_back(victims)
+        if session_data is None:
+            raise KeyError(student_name)
+        return session_data
+    
+    def __setitem__(self, student_name, session_data):
+        while True:
+            with self._lock:
+                busy = self._busy.get(student_name)
+                if busy is None:
+                    self._sessions[student_name] = [session_data, time.monotonic()]
+                    self._sessions.move_to_end(student_name)
+                    victims = self._pop_over_capacity()
+                    break
+            busy.wait()
+        self._write_back(victims)
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+    
+    def get(self, student_name, default=None):
+        try:
+            return self[student_name]
+        except KeyError:
+            return default
+    
+    def keys(self):
+        """Names of resident sessions"""
+        with self._lock:
+            return list(self._sessions.keys())
+    
+    def _pop(self, student_name):
+        """Take one session out and mark it busy; caller holds the lock"""
+        session_data, _ = self._sessions.pop(student_name)
+        self._busy[student_name] = threading.Event()
+        self.evictions += 1
+        return student_name, session_data
+    
+    def _pop_over_capacity(self):
+        victims = []
+        while len(self._sessions) > self.max_resident:
+            victims.append(self._pop(next(iter(self._sessions))))
+        return victims
+    
+    def _write_back(self, victims):
+        """Write popped sessions back outside the lock, then unmark them"""
+        for student_name, session_data in victims:
+            try:
+                self.write_back(student_name, session_data)
+            except Exception as e:
+                print(f"Session write-back error for {student_name}: {e}")
+            finally:
+                with self._lock:
+                    busy = self._busy.pop(student_name)
+                busy.set()
+    
+    def sweep(self, now=None):
+        """
+        Evict every session idle for longer than ttl_seconds
+        
+        Returns:
+            int: Number of sessions evicted
+        """
+        now = time.monotonic() if now is None else now
+        victims = []
+        with self._lock:
+            # Oldest access first, so stop at the first fresh session
+            for student_name, (_, accessed) in list(self._sessions.items()):
+                if now - accessed <= self.ttl_seconds:
+                    break
+                victims.append(self._pop(student_name))
+        self._write_back(victims)
+        return len(victims)
+    
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+    
+    def start_sweeper(self):
+        """Start the background thread that evicts idle sessions"""
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, daemon=True)
+            self._sweeper.start()
+    
+    def close(self):
+        """Stop the sweeper and write back every resident session"""
+        self._stop.set()
+        with self._lock:
+            victims = [self._pop(student_name) for student_name in list(self._sessions)]
+        self._write_back(victims)
+    
+    def get_stats(self):
+        """Get resident/evicted/rehydrated counters"""
+        with self._lock:
+            return {
+                'resident': len(self._sessions),
+                'evictions': self.evictions,
+                'rehydrated': self.rehydrations
+            }
@@ -0,0 +1,305 @@
+"""
+Session state shared by every local worker process
+A SQLite (WAL) table of session snapshots guarded by per-student file locks
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no POSIX byte-range locks
+    fcntl = None
+
+from .session_store import SessionStore, write_back_session
+
+SESSIONS_DB_PATH = os.path.join('data', 'sessions.db')
+
+class SharedSessionBackend:
+    """Versioned session snapshots in SQLite plus per-student cross-process locks"""
+    
+    def __init__(self, db_path=SESSIONS_DB_PATH, lock_path=None, n_slots=4096):
+        """
+        Open (and create if needed) the shared session table
+        
+        Args:
+            db_path: SQLite database holding the session table
+            lock_path: Lock file, one byte per slot (defaults to db_path + '.lock')
+            n_slots: Number of lock slots students are hashed into
+        """
+        if fcntl is None:
+            raise RuntimeError("Shared sessions need POSIX file locks (fcntl)")
+        self.db_path = db_path
+        self.lock_path = lock_path or db_path + '.lock'
+        self.n_slots = n_slots
+        
+        # fcntl locks belong to the process, so threads also need a slot lock
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._slot_locks = [threading.RLock() for _ in range(n_slots)]
+        self._local = threading.local()
+        
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS active_sessions (
+                    student_name TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+    
+    def _connection(self):
+        """This thread's connection, opened in WAL mode on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.depth = {}
+        return conn
+    
+    def _slot(self, student_name):
+        return zlib.crc32(student_name.encode('utf-8')) % self.n_slots
+    
+    def acquire(self, student_name, blocking=True):
+        """
+        Lock a student across threads and processes
+        
+        Re-entrant within a thread; every successful acquire needs a
+        matching release.
+        
+        Returns:
+            bool: False if blocking is off and someone else holds the lock
+        """
+        self._connection()
+        slot = self._slot(student_name)
+        if not self._slot_locks[slot].acquire(blocking):
+            return False
+        depth = self._local.depth.get(slot, 0)
+        if depth == 0:
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB,
+                            1, slot)
+            except (BlockingIOError, PermissionError):  # EAGAIN or EACCES
+                self._slot_locks[slot].release()
+                return False
+            except BaseException:
+                self._slot_locks[slot].release()
+                raise
+        self._local.depth[slot] = depth + 1
+        return True
+    
+    def release(self, student_name):
+        """Release one acquire of a student's lock"""
+        slot = self._slot(student_name)
+        depth = self._local.depth[slot] - 1
+        self._local.depth[slot] = depth
+        if depth == 0:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, slot)
+        self._slot_locks[slot].release()
+    
+    @contextmanager
+    def lock(self, student_name):
+        """Context manager form of acquire/release"""
+        self.acquire(student_name)
+        try:
+            yield
+        finally:
+            self.release(student_name)
+    
+    def version(self, student_name):
+        """Get the snapshot version of a student, or None if absent"""
+        row = self._connection().execute(
+            "SELECT version FROM active_sessions WHERE student_name = ?", (student_name,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def load(self, student_name):
+        """
+        Read a student's snapshot
+        
+        Returns:
+            tuple: (version, state dict), or None if absent
+        """
+        row = self._connection().execute(
+            "SELECT version, state FROM active_sessions WHERE student_name = ?", (student_name,)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+    
+    def save(self, student_name, state, version):
+        """Write a snapshot at a version; callers hold the student's lock"""
+        with self._connection() as conn:
+            conn.execute("""
+                INSERT INTO active_sessions (student_name, state, version, updated)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(student_name) DO UPDATE SET
+                    state = excluded.state,
+                    version = excluded.version,
+                    updated = excluded.updated
+            """, (student_name, state, version, time.time()))
+    
+    def touch(self, student_name):
+        """Mark a snapshot as in use without changing it"""
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE active_sessions SET updated = ? WHERE student_name = ?",
+                (time.time(), student_name)
+            )
+    
+    def prune(self, max_idle_seconds):
+        """
+        Delete snapshots no worker has written or touched for max_idle_seconds
+        
+        Returns:
+            int: Number of snapshots deleted
+        """
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM active_sessions WHERE updated < ?",
+                (time.time() - max_idle_seconds,)
+            )
+        return cursor.rowcount
+
+class SharedSessionStore(SessionStore):
+    """
+    SessionStore whose sessions are visible to every worker process
+    
+    Each worker keeps live engines in its local LRU. A request checks a
+    student out (acquire), which takes the student's lock and reloads
+    the local copy if another worker published a newer version. Checking
+    in (release) publishes the session if it changed and drops the lock.
+    Different students hash to different lock slots, so workers only
+    wait on each other for the same student.
+    
+    An evicted session is written back to the database only if it is
+    still the backend's current version; otherwise the worker that
+    published the newer one owns the write-back.
+    """
+    
+    def __init__(self, factory, backend, dump, restore, **options):
+        """
+        Initialize the store
+        
+        Args:
+            factory: Callable(student_name) building a session from saved
+                     progress, or returning None if nothing is saved
+            backend: SharedSessionBackend
+            dump: Callable(session_data) -> JSON-serializable state
+            restore: Callable(student_name, state) -> session_data
+            **options: SessionStore options (max_resident, ttl_seconds, ...)
+        """
+        self.base_write_back = options.pop('write_back', write_back_session)
+        super().__init__(self._rehydrate, write_back=self._write_back_current, **options)
+        self.base_factory = factory
+        self.backend = backend
+        self.dump = dump
+        self.restore = restore
+        
+        # name -> (version, JSON, wall time) last synced with the backend
+        self._synced = {}
+        # name -> synced version of sessions popped for write-back
+        self._evicted = {}
+        self.reloads = 0
+        self.stale_write_backs = 0
+    
+    def _rehydrate(self, student_name):
+        loaded = self.backend.load(student_name)
+        if loaded is None:
+            return self.base_factory(student_name)
+        version, state = loaded
+        self._synced[student_name] = (version, json.dumps(state, sort_keys=True), time.time())
+        return self.restore(student_name, state)
+    
+    def __setitem__(self, student_name, session_data):
+        with self.backend.lock(student_name):
+            super().__setitem__(student_name, session_data)
+            self._publish(student_name, session_data)
+    
+    def _publish(self, student_name, session_data):
+        """
+        Write the session if it differs from the last synced state
+        
+        An unchanged session is still touched every quarter TTL, so prune
+        never drops the snapshot of a student who only reads.
+        """
+        state = json.dumps(self.dump(session_data), sort_keys=True)
+        version, synced, touched = self._synced.get(student_name, (None, None, 0.0))
+        now = time.time()
+        if state == synced:
+            if now - touched > self.ttl_seconds / 4:
+                self.backend.touch(student_name)
+                self._synced[student_name] = (version, state, now)
+            return
+        version = max(version or 0, self.backend.version(student_name) or 0) + 1
+        self.backend.save(student_name, state, version)
+        self._synced[student_name] = (version, state, now)
+    
+    def acquire(self, student_name):
+        """Lock a student for a request and bring the local copy up to date"""
+        self.backend.acquire(student_name)
+        try:
+            remote = self.backend.version(student_name)
+            with self._lock:
+                resident = student_name in self._sessions
+                local = self._synced.get(student_name, (None,))[0]
+            if remote is not None and (not resident or local != remote):
+                session_data = self._rehydrate(student_name)
+                SessionStore.__setitem__(self, student_name, session_data)
+                self.reloads += 1
+        except BaseException:
+            self.backend.release(student_name)
+            raise
+    
+    def release(self, student_name):
+        """Publish the student's session if it changed and unlock"""
+        try:
+            with self._lock:
+                entry = self._sessions.get(student_name)
+            if entry is not None:
+                self._publish(student_name, entry[0])
+        finally:
+            self.backend.release(student_name)
+    
+    def _pop(self, student_name):
+        # A rehydrated session is synced again, so the entry can go
+        self._evicted[student_name] = self._synced.pop(student_name, (None,))[0]
+        return super()._pop(student_name)
+    
+    def _write_back_current(self, student_name, session_data):
+        """
+        Write an evicted session back unless another worker has a newer one
+        
+        The lock is not waited for: whoever holds it is serving the student
+        and writes back its own, at least as new, copy on eviction.
+        """
+        with self._lock:
+            version = self._evicted.pop(student_name, None)
+        if not self.backend.acquire(student_name, blocking=False):
+            self.stale_write_backs += 1
+            return
+        try:
+            if version != self.backend.version(student_name):
+                self.stale_write_backs += 1
+                return
+            self.base_write_back(student_name, session_data)
+        finally:
+            self.backend.release(student_name)
+    
+    def sweep(self, now=None):
+        evicted = super().sweep(now)
+        # Twice the TTL, so every worker's sweeper has written its idle copy
+        # back (checked against this snapshot) before the snapshot goes
+        self.backend.prune(2 * self.ttl_seconds)
+        return evicted
+    
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['reloaded'] = self.reloads
+        stats['stale_write_backs'] = self.stale_write_backs
+        return stats
@@ -0,0 +1,234 @@
+"""
+Write-behind persistence for student progress
+Requests enqueue saves; a background thread commits them in batches
+"""
+
+import threading
+import time
+
+from . import mastery_state
+
+# PRAGMA synchronous level of the writer connection per durability setting;
+# 'sync' skips the queue and writes in the calling thread
+DURABILITY_LEVELS = {
+    'off': 'OFF',
+    'normal': 'NORMAL',
+    'full': 'FULL',
+    'sync': 'FULL'
+}
+
+class WriteBehindWriter:
+    """Coalescing, batching writer in front of utils.mastery_state"""
+    
+    def __init__(self, flush_interval_ms=50, max_pending=10000, durability='normal'):
+        """
+        Initialize the writer (call start to launch the thread)
+        
+        Args:
+            flush_interval_ms: Time between batched commits
+            max_pending: Queued students plus answers before callers block
+            durability: 'off', 'normal' or 'full' for the writer's
+                        PRAGMA synchronous, or 'sync' to write through
+        """
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability}")
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max_pending
+        self.durability = durability
+        
+        # Latest save per student (coalesced) and answers in arrival order
+        self._progress = {}
+        self._responses = []
+        # Saves swapped out for the batch currently being committed
+        self._inflight = {}
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._committed = 0
+        self._stop = False
+        self._flush_requested = False
+        self._thread = None
+        
+        self.coalesced = 0
+        self.batches = 0
+        self.rows_written = 0
+        self.failures = 0
+    
+    def start(self):
+        """Launch the background writer thread"""
+        if self._thread is None and self.durability != 'sync':
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+    
+    def _pending(self):
+        return len(self._progress) + len(self._responses)
+    
+    def _wait_for_room(self, student_name=None):
+        """Block while the queue is full; caller holds the condition"""
+        while (self._pending() >= self.max_pending
+               and student_name not in self._progress and not self._stop):
+            self._flush_requested = True
+            self._cond.notify_all()
+            self._cond.wait()
+    
+    def save_student_progress(self, student_name, mastery_levels, learning_style=None,
+                              mastery_timestamps=None, session_state=None):
+        """Queue a progress save; a pending save for the student is replaced"""
+        record = (
+            student_name, dict(mastery_levels), learning_style,
+            dict(mastery_timestamps) if mastery_timestamps else None,
+            session_state
+        )
+        if self._thread is None:
+            self._write_inline([record])
+            return
+        
+        with self._cond:
+            self._wait_for_room(student_name)
+            if student_name in self._progress:
+                self.coalesced += 1
+            self._progress[student_name] = record
+            self._enqueued += 1
+    
+    def log_response(self, student_name, topic, is_correct, time_spent=30, attempts=1,
+                     timestamp=None):
+        """Queue one answer for the response log"""
+        record = (
+            student_name, topic, is_correct, time_spent, attempts,
+            timestamp if timestamp is not None else time.time()
+        )
+        if self._thread is None:
+            self._write_inline(responses=[record])
+            return
+        
+        with self._cond:
+            self._wait_for_room()
+            self._responses.append(record)
+            self._enqueued += 1
+    
+    def load_student_progress(self, student_name):
+        """load_student_progress that also sees saves still in the queue"""
+        with self._cond:
+            record = self._progress.get(student_name) or self._inflight.get(student_name)
+        if record is None:
+            return mastery_state.load_student_progress(student_name)
+        _, mastery_levels, learning_style, mastery_timestamps, session_state = record
+        return {
+            'mastery_levels': dict(mastery_levels),
+            'learning_style': learning_style,
+            'mastery_timestamps': dict(mastery_timestamps or {}),
+            'session_state': session_state
+        }
+    
+    def _write_inline(self, progress_records=(), responses=()):
+        """Write in the calling thread at this writer's synchronous level"""
+        with mastery_state.get_connection() as conn:
+            previous = conn.execute("PRAGMA synchronous").fetchone()[0]
+            conn.execute(f"PRAGMA synchronous={DURABILITY_LEVELS[self.durability]}")
+            try:
+                mastery_state.write_batch(progress_records, responses, conn)
+            finally:
+                # The connection goes back to the pool at its usual level
+                conn.execute(f"PRAGMA synchronous={previous}")
+    
+    def _run(self):
+        # A dedicated connection, so the durability pragma stays off the pool
+        conn = mastery_state.open_connection()
+        conn.execute(f"PRAGMA synchronous={DURABILITY_LEVELS[self.durability]}")
+        while True:
+            with self._cond:
+                if not (self._stop or self._flush_requested):
+                    self._cond.wait(self.flush_interval)
+                self._flush_requested = False
+                progress, self._progress = self._progress, {}
+                responses, self._responses = self._responses, []
+                # Readers still see the batch until it is committed
+                self._inflight = progress
+                target = self._enqueued
+                stop = self._stop
+                # Wake callers blocked on a full queue
+                self._cond.notify_all()
+            
+            committed = True
+            if progress or responses:
+                try:
+                    mastery_state.write_batch(progress.values(), responses, conn)
+                    self.batches += 1
+                    self.rows_written += len(progress) + len(responses)
+                except Exception as e:
+                    print(f"Write-behind error: {e}")
+                    committed = False
+            
+            with self._cond:
+                self._inflight = {}
+                if committed:
+                    self._committed = target
+                else:
+                    # Requeue the batch; saves queued meanwhile are newer
+                    for student_name, record in progress.items():
+                        self._progress.setdefault(student_name, record)
+                    self._responses[:0] = responses
+                    self.failures += 1
+                self._cond.notify_all()
+            if stop:
+                conn.close()
+                break
+            if not committed:
+                # Back off instead of retrying in a tight loop
+                time.sleep(self.flush_interval)
+    
+    def flush(self, timeout=None):
+        """
+        Wait until everything queued before this call is committed
+        
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._cond:
+            if self._thread is None:
+                return True
+            target = self._enqueued
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._committed >= target, timeout)
+    
+    def close(self, timeout=10):
+        """
+        Flush pending writes and stop the thread (the shutdown hook)
+        
+        Returns:
+            bool: False if the thread was still committing when the timeout
+                  expired; the queue is then left to it, not written here
+        """
+        if self._thread is None:
+            return True
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Writing inline now could commit before the older in-flight batch
+            print(f"Write-behind flush did not finish within {timeout}s; "
+                  f"{self._pending()} writes still queued")
+            return False
+        self._thread = None
+        
+        # Anything queued while the thread was finishing is written here
+        with self._cond:
+            progress, self._progress = self._progress, {}
+            responses, self._responses = self._responses, []
+        if progress or responses:
+            self._write_inline(progress.values(), responses)
+        return True
+    
+    def get_stats(self):
+        """Get queue and batching counters"""
+        with self._cond:
+            return {
+                'pending': self._pending(),
+                'enqueued': self._enqueued,
+                'coalesced': self.coalesced,
+                'batches': self.batches,
+                'rows_written': self.rows_written,
+                'failures': self.failures
+            }